@@ -3,3 +3,4 @@ from .documents import router as documents_router
 from .chat import router as chat_router
 from .voice import router as voice_router
 from .analytics import router as analytics_router
+from .admin import router as admin_router
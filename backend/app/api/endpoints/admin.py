@@ -0,0 +1,108 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from datetime import datetime, timezone
+from typing import Optional
+import uuid
+from ...services import supabase_service, profile_store, export_service
+from ...services.export_service import EXPORT_FORMATS
+from ...core.security import get_current_admin
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+@router.get("/profiling")
+async def get_profiling_status(current_user: dict = Depends(get_current_admin)):
+    return profile_store.stats()
+
+@router.get("/profiling/profiles")
+async def list_profiles(
+    kind: Optional[str] = None,
+    path: Optional[str] = None,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_admin)
+):
+    if kind is not None and kind not in ("request", "loop_block"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="kind must be request or loop_block"
+        )
+
+    try:
+        return await supabase_service.list_profiles(kind=kind, path=path, limit=min(limit, 500))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch profiles: {str(e)}"
+        )
+
+@router.get("/profiling/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = "folded",
+    current_user: dict = Depends(get_current_admin)
+):
+    try:
+        uuid.UUID(profile_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+
+    try:
+        profile = await supabase_service.get_profile(profile_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch profile: {str(e)}"
+        )
+
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+
+    if format == "json":
+        return profile
+    return PlainTextResponse(profile["stacks"] + "\n" if profile["stacks"] else "")
+
+@router.get("/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin)
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of {', '.join(EXPORT_FORMATS)}"
+        )
+    if start and end and start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+
+    try:
+        selected = export_service.resolve_fields(dataset, fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    if export_service.busy:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many exports in progress, try again shortly"
+        )
+
+    filename = f"{dataset}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}.{format}"
+    return StreamingResponse(
+        export_service.stream(dataset, selected, format, start, end),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
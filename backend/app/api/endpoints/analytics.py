@@ -1,19 +1,25 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List, Dict, Any
-from ...services import supabase_service, pinecone_service
+from fastapi import APIRouter, HTTPException, status, Depends, Request
+from fastapi.responses import ORJSONResponse
+import asyncio
+from typing import List, Dict, Any, Optional
+from ...services import chunk_store, chunk_sync, supabase_service, pinecone_service, openai_service, llm_scheduler, rag_service, answer_store, conversation_memory, latency_metrics, query_stats, index_manager
+from ...core.config import settings
+from ...core.http_cache import conditional_json
 from ...core.security import get_current_admin
-from datetime import datetime, timedelta
+from ...core.sketches import QuantileSketch
+from datetime import datetime, timedelta, timezone
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
-@router.get("/queries")
+@router.get("/queries", response_class=ORJSONResponse)
 async def get_query_analytics(
+    request: Request,
     limit: int = 100,
     current_user: dict = Depends(get_current_admin)
 ):
     try:
         analytics = await supabase_service.get_analytics(limit=limit)
-        return analytics
+        return conditional_json(request, analytics)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -22,39 +28,38 @@ async def get_query_analytics(
 
 @router.get("/stats")
 async def get_dashboard_stats(
+    days: int = 7,
+    top: int = 10,
     current_user: dict = Depends(get_current_admin)
 ):
     try:
-        documents = await supabase_service.get_documents(limit=1000)
-        chats = await supabase_service.client.table("chats").select("*").execute()
-        users = await supabase_service.client.table("users").select("*").execute()
-        analytics = await supabase_service.get_analytics(limit=1000)
-
-        total_documents = len(documents)
-        total_chats = len(chats.data) if chats.data else 0
-        total_users = len(users.data) if users.data else 0
-
-        avg_response_time = 0
-        if analytics:
-            response_times = [a["response_time"] for a in analytics if a.get("response_time")]
-            if response_times:
-                avg_response_time = sum(response_times) / len(response_times)
-
-        most_common_queries = {}
-        for item in analytics[:50]:
-            query = item.get("query", "").lower()
-            most_common_queries[query] = most_common_queries.get(query, 0) + 1
+        total_documents, total_chats, total_users = await asyncio.gather(
+            supabase_service.count_documents(),
+            supabase_service.count_chats(),
+            supabase_service.count_users()
+        )
 
-        top_queries = sorted(most_common_queries.items(), key=lambda x: x[1], reverse=True)[:10]
+        top_queries, top_queries_recent = await asyncio.gather(
+            query_stats.top(limit=top),
+            query_stats.top(days=days, limit=top)
+        )
 
         pinecone_stats = await pinecone_service.get_index_stats()
 
+        now = datetime.now(timezone.utc)
+        response_times = QuantileSketch(settings.LATENCY_SKETCH_ACCURACY)
+        for sketch in (await latency_metrics.summarize(now - timedelta(hours=24), now, stage="total")).values():
+            response_times.merge(sketch)
+        response_time_summary = response_times.summary()
+
         return {
             "total_documents": total_documents,
             "total_chats": total_chats,
             "total_users": total_users,
-            "avg_response_time": round(avg_response_time, 2),
-            "top_queries": [{"query": q, "count": c} for q, c in top_queries],
+            "avg_response_time": round(response_time_summary["mean"] or 0, 2),
+            "response_time_24h": response_time_summary,
+            "top_queries": top_queries,
+            "top_queries_recent": {"days": days, "queries": top_queries_recent},
             "vector_db_stats": pinecone_stats
         }
 
@@ -64,28 +69,134 @@ async def get_dashboard_stats(
             detail=f"Failed to fetch dashboard stats: {str(e)}"
         )
 
-@router.get("/users")
-async def get_user_stats(
+@router.get("/routing")
+async def get_routing_stats(
+    days: int = 7,
     current_user: dict = Depends(get_current_admin)
 ):
     try:
-        users = await supabase_service.client.table("users").select("*").execute()
+        since = datetime.utcnow() - timedelta(days=days)
+        tiers: Dict[str, Dict[str, List[float]]] = {}
+        async for row in supabase_service.iter_analytics_queries(
+            since,
+            columns="id,created_at,model_tier,model,response_time,llm_latency,prompt_tokens,completion_tokens"
+        ):
+            tier = tiers.setdefault(row.get("model_tier") or "none", {
+                "models": set(), "response_time": [], "llm_latency": [], "prompt_tokens": [], "completion_tokens": []
+            })
+            if row.get("model"):
+                tier["models"].add(row["model"])
+            for field in ("response_time", "llm_latency", "prompt_tokens", "completion_tokens"):
+                if row.get(field) is not None:
+                    tier[field].append(row[field])
 
-        student_count = sum(1 for u in users.data if u.get("role") == "student")
-        admin_count = sum(1 for u in users.data if u.get("role") == "admin")
+        def percentile(values: List[float], percent: float):
+            if not values:
+                return None
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))], 3)
 
-        recent_users = sorted(
-            users.data,
-            key=lambda x: x.get("created_at", ""),
-            reverse=True
-        )[:10]
+        return {
+            "since": since.isoformat(),
+            "tiers": {
+                name: {
+                    "requests": len(tier["response_time"]),
+                    "models": sorted(tier["models"]),
+                    "median_response_time": percentile(tier["response_time"], 50),
+                    "p95_response_time": percentile(tier["response_time"], 95),
+                    "median_llm_latency": percentile(tier["llm_latency"], 50),
+                    "prompt_tokens": sum(tier["prompt_tokens"]),
+                    "completion_tokens": sum(tier["completion_tokens"])
+                }
+                for name, tier in tiers.items()
+            }
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch routing stats: {str(e)}"
+        )
+
+def _as_utc(moment: datetime) -> datetime:
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+@router.get("/latency")
+async def get_latency_percentiles(
+    hours: int = 24,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    endpoint: Optional[str] = None,
+    mode: Optional[str] = None,
+    stage: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin)
+):
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    start = _as_utc(start) if start else end - timedelta(hours=hours)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
 
+    try:
+        sketches = await latency_metrics.summarize(start, end, endpoint=endpoint, mode=mode, stage=stage)
         return {
-            "total_users": len(users.data),
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "groups": [
+                {"endpoint": key[0], "mode": key[1], "stage": key[2], **sketch.summary()}
+                for key, sketch in sorted(sketches.items())
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch latency percentiles: {str(e)}"
+        )
+
+@router.get("/metrics")
+async def get_service_metrics(
+    current_user: dict = Depends(get_current_admin)
+):
+    return {
+        "llm_scheduler": llm_scheduler.stats(),
+        "embedding": openai_service.embedding_call.stats(),
+        "vector_search": pinecone_service.search_call.stats(),
+        "embedding_cache": openai_service.embedding_cache.stats(),
+        "local_vectors": pinecone_service.local_vectors.stats(),
+        "search_results": pinecone_service.search_results.stats(),
+        "chunk_store": {**chunk_store.stats(), "remote_fetches": pinecone_service.hydration_fetches, "sync": chunk_sync.stats()},
+        "coalescing": {
+            "embeddings": openai_service.embedding_flight.stats(),
+            "speech": openai_service.speech_flight.stats(),
+            "answers": rag_service.answer_flight.stats()
+        },
+        "answer_store": answer_store.stats(),
+        "conversation_memory": conversation_memory.stats(),
+        "latency_rollups": latency_metrics.stats(),
+        "query_stats": query_stats.stats(),
+        "vector_index": index_manager.stats()
+    }
+
+@router.get("/users", response_class=ORJSONResponse)
+async def get_user_stats(
+    request: Request,
+    current_user: dict = Depends(get_current_admin)
+):
+    try:
+        total_users, student_count, admin_count, recent_users = await asyncio.gather(
+            supabase_service.count_users(),
+            supabase_service.count_users(role="student"),
+            supabase_service.count_users(role="admin"),
+            supabase_service.get_recent_users(limit=10)
+        )
+
+        return conditional_json(request, {
+            "total_users": total_users,
             "students": student_count,
             "admins": admin_count,
             "recent_users": recent_users
-        }
+        })
 
     except Exception as e:
         raise HTTPException(
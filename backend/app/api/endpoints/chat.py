@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Response
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from typing import List, Optional
+import orjson
 import uuid
 import time
-from ...schemas import ChatRequest, ChatResponse, ChatHistory, DiscussionPart
-from ...services import supabase_service, openai_service, pinecone_service
+from ...schemas import ChatRequest, ChatResponse, ChatHistory, ChatHistoryPreview, DiscussionPart
+from ...services import supabase_service, openai_service, rag_service, conversation_memory, latency_metrics, query_stats
+from ...services.rag_service import OFF_TOPIC_RESPONSE
+from ...core.pagination import encode_cursor, decode_cursor
+from ...core.request_context import current_endpoint
 from ...core.security import get_current_user
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
@@ -14,132 +19,144 @@ async def chat(
     current_user: dict = Depends(get_current_user)
 ):
     start_time = time.time()
+    current_endpoint.set(("chat", request.mode))
 
     try:
-        is_relevant = await openai_service.check_ca_relevance(request.message)
+        response_text, discussion, route = await rag_service.answer(
+            message=request.message,
+            mode=request.mode,
+            conversation_id=request.conversation_id,
+            category=request.category
+        )
 
-        if not is_relevant:
-            response_text = "I specialize in topics related to Chartered Accountancy. Please ask a question about accounting, tax, audit, or other CA subjects."
-            conversation_id = request.conversation_id or str(uuid.uuid4())
-
-            await supabase_service.save_chat(
-                user_id=current_user["sub"],
-                message=request.message,
-                bot_response=response_text,
-                mode=request.mode,
-                conversation_id=conversation_id
-            )
-
-            response_time = time.time() - start_time
-            await supabase_service.log_analytics(
-                query=request.message,
-                response_time=response_time
-            )
-
-            return ChatResponse(
-                response=response_text,
-                mode=request.mode,
-                conversation_id=conversation_id,
-                timestamp=time.time()
-            )
+        conversation_id = request.conversation_id or str(uuid.uuid4())
+
+        await supabase_service.save_chat(
+            user_id=current_user["sub"],
+            message=request.message,
+            bot_response=response_text,
+            mode=request.mode,
+            conversation_id=conversation_id
+        )
+        conversation_memory.schedule_compaction(conversation_id)
+
+        response_time = time.time() - start_time
+        latency_metrics.observe("chat", request.mode, response_time, route)
+        query_stats.observe(request.message)
+        await supabase_service.log_analytics(
+            query=request.message,
+            response_time=response_time,
+            **(route.analytics_fields() if route else {})
+        )
 
-        query_embedding = await openai_service.create_embedding(request.message)
+        return ChatResponse(
+            response=response_text,
+            mode=request.mode,
+            conversation_id=conversation_id,
+            timestamp=time.time(),
+            discussion=[DiscussionPart(**item) for item in discussion] if discussion is not None else None
+        )
 
-        similar_docs = await pinecone_service.search_similar(
-            query_embedding=query_embedding,
-            top_k=5
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate response: {str(e)}"
         )
 
-        context = "\n\n".join([doc["text"] for doc in similar_docs if doc["score"] > 0.7])
+@router.post("/discussion/stream")
+async def stream_discussion(
+    request: ChatRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    start_time = time.time()
+    current_endpoint.set(("chat_stream", "discussion"))
 
-        conversation_history = []
-        if request.conversation_id:
-            history = await supabase_service.get_conversation_history(
-                conversation_id=request.conversation_id,
-                limit=10
-            )
-            for item in history:
-                conversation_history.append({"role": "user", "content": item["message"]})
-                conversation_history.append({"role": "assistant", "content": item["bot_response"]})
+    try:
+        is_relevant = await openai_service.check_ca_relevance(request.message)
+        context = await rag_service.retrieve_context(request.message, request.category) if is_relevant else ""
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate response: {str(e)}"
+        )
 
-        conversation_id = request.conversation_id or str(uuid.uuid4())
+    conversation_id = request.conversation_id or str(uuid.uuid4())
+    route = openai_service.route_chat(request.message, mode="discussion") if is_relevant else None
+    items = await openai_service.stream_discussion(topic=request.message, context=context, route=route) if is_relevant else None
 
-        if request.mode == "discussion":
-            discussion = await openai_service.generate_discussion(
-                topic=request.message,
-                context=context
-            )
-
-            discussion_text = "\n\n".join([
-                f"{item['speaker']}: {item['text']}" for item in discussion
-            ])
-
-            await supabase_service.save_chat(
-                user_id=current_user["sub"],
-                message=request.message,
-                bot_response=discussion_text,
-                mode=request.mode,
-                conversation_id=conversation_id
-            )
-
-            response_time = time.time() - start_time
-            await supabase_service.log_analytics(
-                query=request.message,
-                response_time=response_time
-            )
-
-            return ChatResponse(
-                response=discussion_text,
-                mode=request.mode,
-                conversation_id=conversation_id,
-                timestamp=time.time(),
-                discussion=[DiscussionPart(**item) for item in discussion]
-            )
+    async def discussion_stream():
+        discussion = []
 
+        if items is not None:
+            async for item in items:
+                part = DiscussionPart(speaker=item["speaker"], text=item["text"])
+                discussion.append(part)
+                yield part.model_dump_json() + "\n"
         else:
-            response_text = await openai_service.generate_chat_response(
-                prompt=request.message,
-                context=context,
-                conversation_history=conversation_history
-            )
-
-            await supabase_service.save_chat(
-                user_id=current_user["sub"],
-                message=request.message,
-                bot_response=response_text,
-                mode=request.mode,
-                conversation_id=conversation_id
-            )
-
-            response_time = time.time() - start_time
-            await supabase_service.log_analytics(
-                query=request.message,
-                response_time=response_time
-            )
-
-            return ChatResponse(
-                response=response_text,
-                mode=request.mode,
-                conversation_id=conversation_id,
-                timestamp=time.time()
-            )
+            part = DiscussionPart(speaker="Assistant", text=OFF_TOPIC_RESPONSE)
+            discussion.append(part)
+            yield part.model_dump_json() + "\n"
 
-    except Exception as e:
+        discussion_text = "\n\n".join([
+            f"{part.speaker}: {part.text}" for part in discussion
+        ])
+
+        await supabase_service.save_chat(
+            user_id=current_user["sub"],
+            message=request.message,
+            bot_response=discussion_text,
+            mode="discussion",
+            conversation_id=conversation_id
+        )
+        conversation_memory.schedule_compaction(conversation_id)
+
+        response_time = time.time() - start_time
+        latency_metrics.observe("chat_stream", "discussion", response_time, route)
+        query_stats.observe(request.message)
+        await supabase_service.log_analytics(
+            query=request.message,
+            response_time=response_time,
+            **(route.analytics_fields() if route else {})
+        )
+
+    return StreamingResponse(
+        discussion_stream(),
+        media_type="application/x-ndjson",
+        headers={"X-Conversation-Id": conversation_id}
+    )
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[List[str]]:
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to generate response: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
 
-@router.get("/history", response_model=List[ChatHistory])
+def _set_next_cursor(response: Response, rows: List[dict], limit: int):
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+
+@router.get("/history", response_model=List[ChatHistory], response_class=ORJSONResponse)
 async def get_chat_history(
+    response: Response,
     limit: int = 50,
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
+    before = _parse_cursor(cursor)
     try:
         history = await supabase_service.get_chat_history(
             user_id=current_user["sub"],
-            limit=limit
+            limit=limit,
+            cursor=before
         )
+        _set_next_cursor(response, history, limit)
         return [ChatHistory(**item) for item in history]
     except Exception as e:
         raise HTTPException(
@@ -147,16 +164,64 @@ async def get_chat_history(
             detail=f"Failed to fetch chat history: {str(e)}"
         )
 
-@router.get("/conversation/{conversation_id}", response_model=List[ChatHistory])
+@router.get("/history/previews", response_model=List[ChatHistoryPreview], response_class=ORJSONResponse)
+async def get_chat_history_previews(
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    before = _parse_cursor(cursor)
+    try:
+        history = await supabase_service.get_chat_previews(
+            user_id=current_user["sub"],
+            limit=limit,
+            cursor=before
+        )
+        _set_next_cursor(response, history, limit)
+        return [
+            ChatHistoryPreview(preview=item.get("bot_response_preview") or "", **item)
+            for item in history
+        ]
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch chat history: {str(e)}"
+        )
+
+@router.get("/conversation/{conversation_id}", response_model=List[ChatHistory], response_class=ORJSONResponse)
 async def get_conversation(
     conversation_id: str,
+    response: Response,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    format: str = "json",
     current_user: dict = Depends(get_current_user)
 ):
+    after = _parse_cursor(cursor)
+
+    if format == "ndjson":
+        async def export_stream():
+            async for item in supabase_service.iter_conversation(
+                conversation_id=conversation_id,
+                user_id=current_user["sub"]
+            ):
+                yield orjson.dumps(item) + b"\n"
+
+        return StreamingResponse(
+            export_stream(),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f"attachment; filename=conversation-{conversation_id}.ndjson"}
+        )
+
     try:
-        history = await supabase_service.get_conversation_history(
+        history = await supabase_service.get_conversation_page(
             conversation_id=conversation_id,
-            limit=100
+            user_id=current_user["sub"],
+            limit=limit,
+            cursor=after
         )
+        _set_next_cursor(response, history, limit)
         return [ChatHistory(**item) for item in history]
     except Exception as e:
         raise HTTPException(
@@ -1,8 +1,21 @@
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form
-from typing import List, Optional
-from ...schemas import DocumentResponse, DocumentUpdate
-from ...services import supabase_service, openai_service, pinecone_service, document_processor
+from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form, Request
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional, Tuple
+from ...schemas import DocumentResponse, DocumentUpdate, BulkUploadResponse, BulkUploadResult
+from ...services import supabase_service, vector_registry, document_processor, ingestion_service, answer_store
+from ...services.document_processor import DOCUMENT_TYPES
+from ...services.pinecone_service import namespace_for
+from ...services.vector_registry import vector_references
+from ...services.supabase_service import document_content_fields
+from ...core.config import settings
+from ...core.http_cache import conditional_json
+from ...core.pagination import encode_cursor, decode_cursor
+from ...core.request_context import Priority, request_priority
 from ...core.security import get_current_admin
+from ...core.text import content_hash
+import asyncio
+import os
+import tempfile
 import uuid
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
@@ -14,28 +27,20 @@ async def upload_document(
     category: str = Form("general"),
     current_user: dict = Depends(get_current_admin)
 ):
-    allowed_types = [
-        "application/pdf",
-        "application/msword",
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        "text/plain"
-    ]
-
-    if file.content_type not in allowed_types:
+    if file.content_type not in DOCUMENT_TYPES.values():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid file type. Please upload PDF, DOC, DOCX, or TXT files."
         )
 
-    if file.size and file.size > 10 * 1024 * 1024:
+    if file.size and file.size > settings.MAX_UPLOAD_SIZE:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File size exceeds 10MB limit"
+            detail=f"File size exceeds {settings.MAX_UPLOAD_SIZE // (1024 * 1024)}MB limit"
         )
 
     try:
-        file_content = await file.read()
-        full_text, chunks = document_processor.process_file(file_content, file.filename)
+        full_text, chunks = await asyncio.to_thread(document_processor.process_file, file.file, file.filename)
 
         if not full_text:
             raise HTTPException(
@@ -43,13 +48,19 @@ async def upload_document(
                 detail="Could not extract text from the document"
             )
 
+        digest = content_hash(full_text)
+        duplicates = await supabase_service.find_documents_by_hash([digest], category)
+        if duplicates:
+            return DocumentResponse(**duplicates[0])
+
         document = await supabase_service.create_document(
             title=title,
             content=full_text,
             category=category,
-            size=len(file_content),
+            size=file.size or 0,
             file_type=file.content_type,
-            uploaded_by=current_user["sub"]
+            uploaded_by=current_user["sub"],
+            content_hash=digest
         )
 
         if not document:
@@ -58,44 +69,152 @@ async def upload_document(
                 detail="Failed to save document"
             )
 
-        embeddings = await openai_service.create_embeddings_batch(chunks)
-
-        metadata = {
-            "doc_id": document["id"],
-            "title": title,
-            "category": category
-        }
+        with request_priority(Priority.BULK):
+            failures, _ = await ingestion_service.index_documents([(document, chunks)], category)
 
-        await pinecone_service.upsert_document(
-            doc_id=document["id"],
-            chunks=chunks,
-            embeddings=embeddings,
-            metadata=metadata
-        )
+        if failures:
+            try:
+                await vector_registry.delete_documents([document["id"]])
+            except Exception:
+                pass
+            await supabase_service.delete_document(document["id"])
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to process document: {failures[document['id']]}"
+            )
 
         return DocumentResponse(**document)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process document: {str(e)}"
         )
 
-@router.get("/", response_model=List[DocumentResponse])
+def _stage_uploads(files: List[UploadFile], directory: str) -> Tuple[List[Tuple[str, str]], List[BulkUploadResult]]:
+    collected = []
+    rejected = []
+    remaining = settings.BULK_UPLOAD_MAX_EXTRACTED_BYTES
+    size_error = f"File size exceeds {settings.MAX_UPLOAD_SIZE // (1024 * 1024)}MB limit"
+    total_error = f"Upload exceeds {settings.BULK_UPLOAD_MAX_EXTRACTED_BYTES // (1024 * 1024)}MB of extracted documents"
+
+    for file in files:
+        filename = file.filename or "upload"
+        file_ext = filename.lower().split('.')[-1]
+
+        if file_ext == "zip":
+            try:
+                extracted = document_processor.extract_archive(
+                    file.file,
+                    settings.MAX_UPLOAD_SIZE,
+                    directory,
+                    max(0, settings.BULK_UPLOAD_MAX_FILES - len(collected)),
+                    remaining
+                )
+                collected.extend(extracted)
+                remaining -= sum(os.path.getsize(path) for _, path in extracted)
+            except ValueError as e:
+                rejected.append(BulkUploadResult(filename=filename, status="failed", error=str(e)))
+        elif file_ext in DOCUMENT_TYPES:
+            if file.size and file.size > settings.MAX_UPLOAD_SIZE:
+                rejected.append(BulkUploadResult(filename=filename, status="failed", error=size_error))
+                continue
+            limit = min(settings.MAX_UPLOAD_SIZE, remaining)
+            path = os.path.join(directory, uuid.uuid4().hex)
+            try:
+                remaining -= document_processor.copy_stream(file.file, path, limit)
+                collected.append((filename, path))
+            except ValueError:
+                error = size_error if limit == settings.MAX_UPLOAD_SIZE else total_error
+                rejected.append(BulkUploadResult(filename=filename, status="failed", error=error))
+        else:
+            rejected.append(BulkUploadResult(filename=filename, status="skipped", error="Unsupported file type"))
+
+    return collected, rejected
+
+@router.post("/bulk-upload", response_model=BulkUploadResponse)
+async def bulk_upload_documents(
+    files: List[UploadFile] = File(...),
+    category: str = Form("general"),
+    current_user: dict = Depends(get_current_admin)
+):
+    with tempfile.TemporaryDirectory(prefix="bulk-upload-") as directory:
+        collected, rejected = await asyncio.to_thread(_stage_uploads, files, directory)
+
+        if len(collected) > settings.BULK_UPLOAD_MAX_FILES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Bulk upload is limited to {settings.BULK_UPLOAD_MAX_FILES} documents"
+            )
+
+        try:
+            with request_priority(Priority.BULK):
+                outcomes = await ingestion_service.ingest_files(
+                    files=collected,
+                    category=category,
+                    uploaded_by=current_user["sub"]
+                )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to process documents: {str(e)}"
+            )
+
+    results = [BulkUploadResult(**outcome) for outcome in outcomes] + rejected
+    succeeded = sum(1 for result in results if result.status == "success")
+    duplicates = sum(1 for result in results if result.status == "duplicate")
+
+    return BulkUploadResponse(
+        total=len(results),
+        succeeded=succeeded,
+        duplicates=duplicates,
+        failed=len(results) - succeeded - duplicates,
+        results=results
+    )
+
+@router.get("/", response_model=List[DocumentResponse], response_class=ORJSONResponse)
 async def get_documents(
+    request: Request,
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    search: Optional[str] = None,
     current_user: dict = Depends(get_current_admin)
 ):
     try:
-        documents = await supabase_service.get_documents(limit=limit, offset=offset)
-        return [DocumentResponse(**doc) for doc in documents]
+        after = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    try:
+        documents = await supabase_service.list_documents(
+            limit=limit,
+            cursor=after,
+            category=category,
+            search=search,
+            offset=offset
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch documents: {str(e)}"
         )
 
+    headers = {}
+    if len(documents) == limit:
+        last = documents[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last["uploaded_at"], last["id"])
+
+    return conditional_json(request, [DocumentResponse(**doc).model_dump() for doc in documents], headers)
+
 @router.get("/{doc_id}", response_model=DocumentResponse)
 async def get_document(
     doc_id: str,
@@ -123,14 +242,78 @@ async def update_document(
         )
 
     update_data = updates.dict(exclude_unset=True)
-    updated_doc = await supabase_service.update_document(doc_id, update_data)
+    content = update_data.pop("content", None)
+    category = update_data["category"] if "category" in update_data else document["category"]
+    previous = None
+    current = None
+    moved = False
+
+    if content is not None:
+        chunks = document_processor.chunk_text(content)
+        if not chunks:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Document content is empty"
+            )
+        update_data["content_hash"] = content_hash(content)
+        update_data.update(document_content_fields(content))
+
+        try:
+            previous = await vector_registry.document_references(doc_id)
+            current = vector_references(doc_id, chunks, namespace_for(category))
+            with request_priority(Priority.BULK):
+                failures, _ = await ingestion_service.index_documents([({**document, **update_data}, chunks)], category)
+            if failures:
+                await vector_registry.settle_references(doc_id, keep=previous, drop=current)
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Failed to update document: {failures[doc_id]}"
+                )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to update document: {str(e)}"
+            )
+    elif "category" in update_data and update_data["category"] != document["category"]:
+        try:
+            moved = await vector_registry.move_document(doc_id, update_data["category"])
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to update document: {str(e)}"
+            )
+
+    try:
+        updated_doc = await supabase_service.update_document(doc_id, update_data)
+    except Exception:
+        updated_doc = None
 
     if not updated_doc:
+        try:
+            if previous is not None:
+                await vector_registry.settle_references(doc_id, keep=previous, drop=current)
+            elif moved:
+                await vector_registry.move_document(doc_id, document["category"])
+        except Exception:
+            pass
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update document"
         )
 
+    if previous is not None:
+        try:
+            await vector_registry.settle_references(doc_id, keep=current, drop=previous)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Document updated but its previous vectors were not released: {str(e)}"
+            )
+
+    await answer_store.invalidate_documents([doc_id])
+
     return DocumentResponse(**updated_doc)
 
 @router.delete("/{doc_id}")
@@ -145,7 +328,14 @@ async def delete_document(
             detail="Document not found"
         )
 
-    await pinecone_service.delete_document(doc_id)
+    try:
+        await vector_registry.delete_documents([doc_id])
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to delete document: {str(e)}"
+        )
+    await answer_store.invalidate_documents([doc_id])
 
     success = await supabase_service.delete_document(doc_id)
     if not success:
@@ -1,47 +1,101 @@
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
+from urllib.parse import quote
 from ...schemas import TTSRequest
-from ...services import openai_service
+from ...services import supabase_service, openai_service, rag_service, conversation_memory, latency_metrics, query_stats
+from ...services.audio_processor import AUDIO_FORMATS
+from ...services.rag_service import OFF_TOPIC_RESPONSE
+from ...core.config import settings
+from ...core.request_context import current_endpoint
 from ...core.security import get_current_user
-import tempfile
-import os
+import asyncio
 import io
+import re
+import time
+import uuid
 
 router = APIRouter(prefix="/voice", tags=["Voice"])
 
+VOICE_MAP = {
+    "en": "alloy",
+    "hi": "nova"
+}
+
+SENTENCE_END = re.compile(r"[.!?\u0964]+[\"')\]]*\s+")
+
+async def _split_sentences(text_stream: AsyncIterator[str]) -> AsyncIterator[str]:
+    buffer = ""
+    async for delta in text_stream:
+        buffer += delta
+        while True:
+            match = None
+            for candidate in SENTENCE_END.finditer(buffer):
+                if candidate.end() >= settings.VOICE_MIN_SENTENCE_CHARS:
+                    match = candidate
+                    break
+            if match is None:
+                break
+            yield buffer[:match.end()].strip()
+            buffer = buffer[match.end():]
+    if buffer.strip():
+        yield buffer.strip()
+
+async def _speak(sentences: AsyncIterator[str], voice: str) -> AsyncIterator[bytes]:
+    pending = asyncio.Queue(maxsize=settings.VOICE_TTS_LOOKAHEAD)
+
+    async def synthesize():
+        try:
+            async for sentence in sentences:
+                await pending.put(asyncio.create_task(
+                    openai_service.generate_speech(text=sentence, voice=voice)
+                ))
+        except Exception as e:
+            await pending.put(e)
+            return
+        await pending.put(None)
+
+    producer = asyncio.create_task(synthesize())
+    try:
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield await item
+    finally:
+        producer.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if isinstance(item, asyncio.Task):
+                item.cancel()
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
 @router.post("/transcribe")
 async def transcribe_audio(
     audio: UploadFile = File(...),
     current_user: dict = Depends(get_current_user)
 ):
     try:
-        allowed_audio_types = [
-            "audio/mpeg",
-            "audio/mp3",
-            "audio/wav",
-            "audio/webm",
-            "audio/ogg",
-            "audio/m4a"
-        ]
-
-        if audio.content_type not in allowed_audio_types:
+        if audio.content_type not in AUDIO_FORMATS:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Unsupported audio format: {audio.content_type}"
             )
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as temp_file:
-            content = await audio.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-
-        try:
-            transcript = await openai_service.transcribe_audio(temp_file_path)
-            return {"transcript": transcript}
-        finally:
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+        content = await audio.read()
+        transcript = await openai_service.transcribe_audio(
+            audio_content=content,
+            filename=audio.filename,
+            content_type=audio.content_type
+        )
+        return {"transcript": transcript}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -54,12 +108,7 @@ async def text_to_speech(
     current_user: dict = Depends(get_current_user)
 ):
     try:
-        voice_map = {
-            "en": "alloy",
-            "hi": "nova"
-        }
-
-        voice = voice_map.get(request.language, "alloy")
+        voice = VOICE_MAP.get(request.language, "alloy")
 
         audio_content = await openai_service.generate_speech(
             text=request.text,
@@ -74,8 +123,101 @@ async def text_to_speech(
             }
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate speech: {str(e)}"
         )
+
+@router.post("/conversation")
+async def voice_conversation(
+    audio: UploadFile = File(...),
+    language: str = Form("en"),
+    conversation_id: Optional[str] = Form(None),
+    category: Optional[str] = Form(None),
+    current_user: dict = Depends(get_current_user)
+):
+    start_time = time.time()
+    current_endpoint.set(("voice", "qa"))
+
+    if audio.content_type not in AUDIO_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported audio format: {audio.content_type}"
+        )
+
+    try:
+        content = await audio.read()
+        transcript = await openai_service.transcribe_audio(
+            audio_content=content,
+            filename=audio.filename,
+            content_type=audio.content_type
+        )
+
+        is_relevant, matches, conversation_history = await asyncio.gather(
+            openai_service.check_ca_relevance(transcript),
+            rag_service.retrieve_matches(transcript, category),
+            rag_service.get_conversation_messages(conversation_id)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process voice question: {str(e)}"
+        )
+
+    conversation_id = conversation_id or str(uuid.uuid4())
+    voice = VOICE_MAP.get(language, "alloy")
+
+    if is_relevant:
+        route = rag_service.route(transcript, "qa", matches)
+        text_stream = await openai_service.stream_chat_response(
+            prompt=transcript,
+            context=rag_service.build_context(matches),
+            conversation_history=conversation_history,
+            route=route
+        )
+    else:
+        route = None
+        text_stream = _single(OFF_TOPIC_RESPONSE)
+
+    async def audio_stream():
+        answer_parts = []
+
+        async def collect():
+            async for delta in text_stream:
+                answer_parts.append(delta)
+                yield delta
+
+        async for audio_chunk in _speak(_split_sentences(collect()), voice):
+            yield audio_chunk
+
+        await supabase_service.save_chat(
+            user_id=current_user["sub"],
+            message=transcript,
+            bot_response="".join(answer_parts),
+            mode="qa",
+            conversation_id=conversation_id
+        )
+        conversation_memory.schedule_compaction(conversation_id)
+
+        response_time = time.time() - start_time
+        latency_metrics.observe("voice", "qa", response_time, route)
+        query_stats.observe(transcript)
+        await supabase_service.log_analytics(
+            query=transcript,
+            response_time=response_time,
+            **(route.analytics_fields() if route else {})
+        )
+
+    return StreamingResponse(
+        audio_stream(),
+        media_type="audio/mpeg",
+        headers={
+            "X-Transcript": quote(transcript),
+            "X-Conversation-Id": conversation_id
+        }
+    )
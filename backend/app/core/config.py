@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Dict, Tuple
+import os
 
 class Settings(BaseSettings):
     SUPABASE_URL: str
@@ -11,6 +12,8 @@ class Settings(BaseSettings):
     PINECONE_API_KEY: str
     PINECONE_ENVIRONMENT: str
     PINECONE_INDEX_NAME: str = "ca-chatbot-embeddings"
+    PINECONE_NAMESPACE_CACHE_SECONDS: int = 60
+    VECTOR_INDEX_REFRESH_SECONDS: int = 30
 
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
@@ -18,11 +21,122 @@ class Settings(BaseSettings):
 
     CORS_ORIGINS: str = "http://localhost:3000,http://localhost:5173"
 
+    SERVER_MODE: str = "development"
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_TIMEOUT: int = 120
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_KEEPALIVE: int = 5
+    SERVER_MAX_REQUESTS: int = 0
+    CACHE_SNAPSHOT_PATH: str = ""
+
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
     EMBEDDING_MODEL: str = "text-embedding-3-large"
     EMBEDDING_DIMENSION: int = 3072
     CHAT_MODEL: str = "gpt-4-turbo-preview"
+    CHAT_MAX_TOKENS: int = 1500
+    DISCUSSION_MAX_TOKENS: int = 2000
+    FAST_CHAT_MODEL: str = "gpt-3.5-turbo"
+    FAST_CHAT_MAX_TOKENS: int = 500
     TTS_MODEL: str = "tts-1"
     WHISPER_MODEL: str = "whisper-1"
+    WHISPER_MAX_FILE_SIZE: int = 25 * 1024 * 1024
+    WHISPER_SEGMENT_SECONDS: int = 600
+    WHISPER_MAX_CONCURRENCY: int = 4
+
+    MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024
+    BULK_UPLOAD_MAX_FILES: int = 500
+    BULK_UPLOAD_MAX_BYTES: int = 200 * 1024 * 1024
+    BULK_UPLOAD_MAX_EXTRACTED_BYTES: int = 1024 * 1024 * 1024
+    DOCUMENT_COMPRESS_MIN_CHARS: int = 16384
+    EMBEDDING_BATCH_SIZE: int = 100
+    REINDEX_PAGE_SIZE: int = 50
+    REINDEX_CONCURRENCY: int = 8
+    INGEST_EXTRACT_WORKERS: int = 0
+    INGEST_EMBED_CONCURRENCY: int = 4
+
+    VOICE_MIN_SENTENCE_CHARS: int = 40
+    VOICE_TTS_LOOKAHEAD: int = 3
+
+    LLM_MAX_CONCURRENCY: int = 64
+    LLM_PER_MODEL_CONCURRENCY: int = 32
+    LLM_MODEL_CONCURRENCY: str = ""
+    LLM_REQUESTS_PER_MINUTE: int = 3000
+    LLM_TOKENS_PER_MINUTE: int = 600000
+    LLM_MODEL_RATE_LIMITS: str = ""
+    LLM_MAX_QUEUE: int = 500
+    LLM_QUEUE_TIMEOUT: float = 30.0
+
+    EMBEDDING_DEADLINE: float = 5.0
+    SEARCH_DEADLINE: float = 2.0
+    HEDGE_PERCENTILE: float = 95.0
+    HEDGE_MIN_DELAY: float = 0.05
+    HEDGE_MIN_SAMPLES: int = 50
+    RETRY_MAX_ATTEMPTS: int = 2
+    RETRY_BASE_DELAY: float = 0.1
+    EMBEDDING_CACHE_SIZE: int = 5000
+    SEARCH_FALLBACK_SIZE: int = 5000
+    SEARCH_RESULT_CACHE_SIZE: int = 2000
+    SEARCH_RESULT_CACHE_SECONDS: int = 60
+    CHUNK_STORE_PATH: str = "data/chunk_store.sqlite3"
+    CHUNK_SYNC_SECONDS: int = 10
+    CHUNK_CHANGE_RETENTION_DAYS: int = 7
+
+    RETRIEVAL_CANDIDATES: int = 20
+    RETRIEVAL_MAX_K: int = 8
+    RETRIEVAL_MIN_SCORE: float = 0.7
+    RETRIEVAL_SCORE_MARGIN: float = 0.12
+    RETRIEVAL_MMR_LAMBDA: float = 0.7
+    RETRIEVAL_DUPLICATE_SIMILARITY: float = 0.95
+    RETRIEVAL_CONTEXT_TOKENS: int = 2500
+
+    ROUTING_ENABLED: bool = True
+    ROUTING_FAST_MAX_QUERY_TOKENS: int = 30
+    ROUTING_FAST_MIN_SCORE: float = 0.8
+
+    HISTORY_TOKEN_BUDGET: int = 1500
+    HISTORY_MAX_TURNS: int = 6
+    SUMMARY_MODEL: str = "gpt-3.5-turbo"
+    SUMMARY_MAX_TOKENS: int = 400
+    SUMMARY_KEEP_RECENT_TURNS: int = 3
+    SUMMARY_MIN_TURNS: int = 2
+    SUMMARY_BATCH_TURNS: int = 20
+
+    LATENCY_SKETCH_ACCURACY: float = 0.01
+    LATENCY_FLUSH_SECONDS: int = 30
+    LATENCY_MINUTE_RETENTION_HOURS: int = 48
+    LATENCY_HOUR_RETENTION_DAYS: int = 90
+
+    PROFILING_ENABLED: bool = True
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_MS: float = 5
+    PROFILING_FLUSH_SECONDS: int = 5
+    PROFILING_RETENTION_DAYS: int = 7
+    LOOP_MONITOR_ENABLED: bool = False
+    LOOP_BLOCK_THRESHOLD_MS: float = 100
+
+    EXPORT_PAGE_SIZE: int = 1000
+    EXPORT_MAX_CONCURRENT: int = 2
+
+    QUERY_STATS_CAPACITY: int = 1000
+    QUERY_STATS_SIMILARITY: float = 0.92
+    QUERY_STATS_RECENT_QUERIES: int = 1000
+    QUERY_STATS_FLUSH_SECONDS: int = 60
+    QUERY_STATS_DAILY_RETENTION_DAYS: int = 30
+
+    ANSWER_STORE_REFRESH_SECONDS: int = 60
+    ANSWER_TTL_HOURS: int = 24
+    ANSWER_WARMUP_INTERVAL_SECONDS: int = 3600
+    ANSWER_WARMUP_LOOKBACK_DAYS: int = 14
+    ANSWER_WARMUP_MIN_COUNT: int = 3
+    ANSWER_WARMUP_MAX_CANDIDATES: int = 1000
+    ANSWER_WARMUP_SIMILARITY: float = 0.92
+    ANSWER_WARMUP_TOP_N: int = 200
+    ANSWER_WARMUP_CONCURRENCY: int = 4
 
     class Config:
         env_file = ".env"
@@ -32,4 +146,27 @@ class Settings(BaseSettings):
     def cors_origins_list(self) -> List[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
 
+    @property
+    def server_workers(self) -> int:
+        return self.SERVER_WORKERS or (os.cpu_count() or 1)
+
+    @property
+    def llm_model_concurrency(self) -> Dict[str, int]:
+        limits = {}
+        for item in self.LLM_MODEL_CONCURRENCY.split(","):
+            if "=" in item:
+                model, limit = item.split("=", 1)
+                limits[model.strip()] = int(limit)
+        return limits
+
+    @property
+    def llm_model_rate_limits(self) -> Dict[str, Tuple[int, int]]:
+        limits = {}
+        for item in self.LLM_MODEL_RATE_LIMITS.split(","):
+            if "=" in item:
+                model, rates = item.split("=", 1)
+                requests_per_minute, tokens_per_minute = rates.split(":")
+                limits[model.strip()] = (int(requests_per_minute), int(tokens_per_minute))
+        return limits
+
 settings = Settings()
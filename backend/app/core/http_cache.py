@@ -0,0 +1,20 @@
+from fastapi import Request, Response
+from typing import Any, Dict, Optional
+import hashlib
+import orjson
+
+def _etag_values(header: Optional[str]) -> set:
+    if not header:
+        return set()
+    return {value.strip().removeprefix("W/") for value in header.split(",")}
+
+def conditional_json(request: Request, content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    body = orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    response_headers = {**(headers or {}), "ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = _etag_values(request.headers.get("if-none-match"))
+    if "*" in if_none_match or etag.removeprefix("W/") in if_none_match:
+        return Response(status_code=304, headers=response_headers)
+
+    return Response(content=body, media_type="application/json", headers=response_headers)
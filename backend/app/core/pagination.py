@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import Any, List, Optional
+import base64
+import json
+import uuid
+
+def encode_cursor(*values: Any) -> str:
+    payload = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: Optional[str], size: int = 2) -> Optional[List[Any]]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(value, str) for value in values):
+        raise ValueError("Invalid cursor")
+    order_value, id_value = values
+    try:
+        datetime.fromisoformat(order_value)
+        id_value = str(uuid.UUID(id_value))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    return [order_value, id_value]
+
+def _quote(value: Any) -> str:
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+def keyset_page(
+    query: Any,
+    order_column: str,
+    cursor: Optional[List[Any]],
+    limit: int,
+    descending: bool = True
+) -> Any:
+    direction = "desc" if descending else "asc"
+    if cursor:
+        order_value, id_value = cursor
+        op = "lt" if descending else "gt"
+        order_value, id_value = _quote(order_value), _quote(id_value)
+        condition = f"{order_column}.{op}.{order_value},and({order_column}.eq.{order_value},id.{op}.{id_value})"
+        query.params = query.params.add("or", f"({condition})")
+    query.params = query.params.add("order", f"{order_column}.{direction},id.{direction}")
+    return query.limit(limit)
@@ -0,0 +1,277 @@
+from collections import Counter, deque
+from datetime import datetime, timezone
+from types import CodeType, FrameType
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from fastapi import HTTPException
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import settings
+from .security import decode_access_token
+from .sketches import worker_source
+
+PROFILE_HEADER = b"x-profile"
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STDLIB_ROOT = os.path.dirname(os.__file__)
+MAX_STACK_DEPTH = 128
+MAX_PENDING = 1000
+
+_labels: Dict[CodeType, str] = {}
+
+def frame_label(code: CodeType) -> str:
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(APP_ROOT):
+            filename = os.path.relpath(filename, APP_ROOT)
+        elif filename.startswith(STDLIB_ROOT) and "site-packages" not in filename:
+            filename = os.path.relpath(filename, STDLIB_ROOT)
+        else:
+            filename = filename.rsplit("site-packages/", 1)[-1]
+        label = _labels[code] = f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+    return label
+
+def collapse_stack(frame: Optional[FrameType]) -> str:
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+def task_label(task: Optional[asyncio.Task]) -> str:
+    if task is None:
+        return "loop callback"
+    coro = task.get_coro()
+    return getattr(coro, "__qualname__", task.get_name())
+
+def folded(samples: Counter) -> str:
+    return "\n".join(f"{stack} {count}" for stack, count in samples.most_common())
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.id = str(uuid.uuid4())
+        self.method = method
+        self.path = path
+        self.status_code: Optional[int] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.samples: Counter = Counter()
+
+    def to_row(self, source: str) -> Dict[str, Any]:
+        samples = Counter(dict.copy(self.samples))
+        return {
+            "id": self.id,
+            "kind": "request",
+            "source": source,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "samples": sum(samples.values()),
+            "stacks": folded(samples),
+            "created_at": self.created_at.isoformat()
+        }
+
+class SamplingProfiler:
+    def __init__(self):
+        self.enabled = settings.PROFILING_ENABLED
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.interval = settings.PROFILING_INTERVAL_MS / 1000
+        self.completed: Deque[Dict[str, Any]] = deque(maxlen=MAX_PENDING)
+        self.profiled = 0
+        self._tasks: Dict[asyncio.Task, RequestProfile] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._previous_factory = None
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def should_profile(self, scope: Scope) -> bool:
+        requested = None
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                requested = value
+            elif name == b"authorization":
+                authorization = value
+        if requested is not None and requested.lower() in (b"1", b"true", b"yes") and authorization:
+            scheme, _, token = authorization.decode("latin-1").partition(" ")
+            try:
+                if scheme.lower() == "bearer" and decode_access_token(token).get("role") == "admin":
+                    return True
+            except HTTPException:
+                pass
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def request_for(self, task: Optional[asyncio.Task]) -> Optional[str]:
+        profile = self._tasks.get(task) if task is not None else None
+        return f"{profile.method} {profile.path}" if profile else None
+
+    def _create_task(self, loop: asyncio.AbstractEventLoop, coro, **kwargs) -> asyncio.Task:
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        profile = self._tasks.get(asyncio.current_task(loop))
+        if profile is not None:
+            self._tasks[task] = profile
+            task.add_done_callback(self._forget)
+        return task
+
+    def _forget(self, task: asyncio.Task):
+        self._tasks.pop(task, None)
+
+    def _run(self):
+        while True:
+            if not self._tasks:
+                self._wake.clear()
+                if not self._tasks:
+                    self._wake.wait()
+            time.sleep(self.interval)
+            task = asyncio.current_task(self._loop)
+            profile = self._tasks.get(task) if task is not None else None
+            if profile is None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                profile.samples[collapse_stack(frame)] += 1
+
+    def start(self, method: str, path: str) -> RequestProfile:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._loop_thread = threading.get_ident()
+        if not self._tasks:
+            self._previous_factory = loop.get_task_factory()
+            loop.set_task_factory(self._create_task)
+
+        profile = RequestProfile(method, path)
+        self._tasks[asyncio.current_task()] = profile
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+        self._wake.set()
+        return profile
+
+    def stop(self, profile: RequestProfile):
+        profile.duration = time.perf_counter() - profile.started
+        for task in [task for task, owner in self._tasks.items() if owner is profile]:
+            del self._tasks[task]
+        if not self._tasks and self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+            self._previous_factory = None
+        self.profiled += 1
+        self.completed.append(profile.to_row(worker_source()))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "active": len(set(self._tasks.values())),
+            "profiled": self.profiled,
+            "pending": len(self.completed)
+        }
+
+class LoopBlockMonitor:
+    def __init__(self, threshold_ms: float):
+        self.threshold = threshold_ms / 1000
+        self.interval = self.threshold / 4
+        self.completed: Deque[Dict[str, Any]] = deque(maxlen=MAX_PENDING)
+        self.blocks = 0
+        self.longest = 0.0
+        self.running = False
+        self._beat = 0.0
+        self._captured: Optional[Tuple[float, str, str]] = None
+
+    def _watch(self, loop: asyncio.AbstractEventLoop, thread_id: int):
+        while self.running:
+            time.sleep(self.interval)
+            beat = self._beat
+            if time.perf_counter() - beat - self.interval < self.threshold:
+                continue
+            if self._captured is not None and self._captured[0] == beat:
+                continue
+            task = asyncio.current_task(loop)
+            frame = sys._current_frames().get(thread_id)
+            self._captured = (beat, collapse_stack(frame), profiler.request_for(task) or task_label(task))
+
+    def _record(self, beat: float, lag: float):
+        captured = self._captured if self._captured is not None and self._captured[0] == beat else None
+        self.blocks += 1
+        self.longest = max(self.longest, lag)
+        self.completed.append({
+            "id": str(uuid.uuid4()),
+            "kind": "loop_block",
+            "source": worker_source(),
+            "method": None,
+            "path": captured[2] if captured else "unknown",
+            "status_code": None,
+            "duration_ms": round(lag * 1000, 3),
+            "samples": 1 if captured else 0,
+            "stacks": f"{captured[1]} 1" if captured else "",
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.running = True
+        self._beat = time.perf_counter()
+        watcher = threading.Thread(target=self._watch, args=(loop, threading.get_ident()), name="loop-block-monitor", daemon=True)
+        watcher.start()
+        try:
+            while True:
+                beat = self._beat = time.perf_counter()
+                await asyncio.sleep(self.interval)
+                lag = time.perf_counter() - beat - self.interval
+                if lag >= self.threshold:
+                    self._record(beat, lag)
+        finally:
+            self.running = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "threshold_ms": self.threshold * 1000,
+            "blocks": self.blocks,
+            "longest_ms": round(self.longest * 1000, 3),
+            "pending": len(self.completed)
+        }
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not profiler.enabled or scope["type"] != "http" or not profiler.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.start(scope["method"], scope["path"])
+
+        async def send_with_profile(message: Message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                MutableHeaders(raw=message["headers"]).append("X-Profile-Id", profile.id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profiler.stop(profile)
+
+def drain(queue: Deque[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows = []
+    while queue:
+        rows.append(queue.popleft())
+    return rows
+
+profiler = SamplingProfiler()
+loop_monitor = LoopBlockMonitor(settings.LOOP_BLOCK_THRESHOLD_MS)
@@ -0,0 +1,20 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Optional, Tuple
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BULK = 1
+
+current_user_id: ContextVar[Optional[str]] = ContextVar("current_user_id", default=None)
+current_priority: ContextVar[Priority] = ContextVar("current_priority", default=Priority.INTERACTIVE)
+current_endpoint: ContextVar[Tuple[str, str]] = ContextVar("current_endpoint", default=("background", "none"))
+
+@contextmanager
+def request_priority(priority: Priority):
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
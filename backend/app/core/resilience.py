@@ -0,0 +1,123 @@
+from collections import deque
+from fastapi import HTTPException, status
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+import asyncio
+import random
+from .config import settings
+from .sketches import latency_recorder
+
+T = TypeVar("T")
+
+class DeadlineExceeded(HTTPException):
+    def __init__(self, operation: str):
+        super().__init__(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"The {operation} service did not respond in time. Please retry."
+        )
+
+class LatencyWindow:
+    def __init__(self, size: int = 512):
+        self.samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if len(self.samples) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+class HedgedCall:
+    def __init__(self, name: str, deadline: float):
+        self.name = name
+        self.stage = name.replace(" ", "_")
+        self.deadline = deadline
+        self.latency = LatencyWindow()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.fallbacks = 0
+
+    async def __call__(self, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline_at = started + self.deadline
+        self.calls += 1
+
+        attempt = 0
+        while True:
+            try:
+                result = await self._attempt(fn, deadline_at)
+                latency_recorder.record(self.stage, loop.time() - started)
+                return result
+            except DeadlineExceeded:
+                self.timeouts += 1
+                latency_recorder.record(self.stage, self.deadline)
+                raise
+            except HTTPException:
+                self.failures += 1
+                raise
+            except Exception:
+                remaining = deadline_at - loop.time()
+                if attempt >= settings.RETRY_MAX_ATTEMPTS or remaining <= 0:
+                    self.failures += 1
+                    raise
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(min(remaining, random.uniform(0, settings.RETRY_BASE_DELAY * 2 ** attempt)))
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]], deadline_at: float) -> T:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        hedge_delay = self.latency.percentile(settings.HEDGE_PERCENTILE)
+        hedge_at = started + max(settings.HEDGE_MIN_DELAY, hedge_delay) if hedge_delay is not None else None
+
+        primary = asyncio.ensure_future(fn())
+        pending = {primary}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                now = loop.time()
+                if now >= deadline_at:
+                    self.latency.record(self.deadline)
+                    raise DeadlineExceeded(self.name)
+
+                wake_at = deadline_at if hedge_at is None else min(deadline_at, hedge_at)
+                done, pending = await asyncio.wait(pending, timeout=wake_at - now, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.latency.record(loop.time() - started)
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+
+                if hedge_at is not None and loop.time() >= hedge_at:
+                    hedge_at = None
+                    if pending:
+                        self.hedged += 1
+                        pending.add(asyncio.ensure_future(fn()))
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": round(self.hedge_wins / self.hedged, 4) if self.hedged else 0.0,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "fallbacks": self.fallbacks,
+            "p50_seconds": self.latency.percentile(50),
+            "p95_seconds": self.latency.percentile(95),
+            "p99_seconds": self.latency.percentile(99)
+        }
@@ -0,0 +1,21 @@
+from uvicorn.workers import UvicornWorker
+from .config import settings
+
+class ProductionWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT
+    }
+
+def post_fork(server, worker):
+    from ..services import pinecone_service
+    pinecone_service.reconnect()
+
+def worker_exit(server, worker):
+    if settings.CACHE_SNAPSHOT_PATH:
+        from . import snapshot
+        try:
+            snapshot.save(settings.CACHE_SNAPSHOT_PATH)
+        except Exception as e:
+            server.log.warning(f"Failed to save cache snapshot: {str(e)}")
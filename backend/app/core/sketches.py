@@ -0,0 +1,212 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import os
+import socket
+from .config import settings
+from .request_context import current_endpoint
+
+RESOLUTIONS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1)}
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, count: int = 1):
+        if value <= self.min_value:
+            self.zero_count += count
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.count += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "QuantileSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return self.min
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "bins": {str(key): count for key, count in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(relative_accuracy=data["relative_accuracy"])
+        sketch.bins = {int(key): count for key, count in data["bins"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        return sketch
+
+    def summary(self) -> Dict[str, Any]:
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return round(value, 4) if value is not None else None
+
+        return {
+            "count": self.count,
+            "mean": rounded(self.sum / self.count) if self.count else None,
+            "p50": rounded(self.quantile(0.5)),
+            "p95": rounded(self.quantile(0.95)),
+            "p99": rounded(self.quantile(0.99)),
+            "max": rounded(self.max)
+        }
+
+class SpaceSaving:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counters: Dict[str, List[int]] = {}
+        self.labels: Dict[str, str] = {}
+        self.total = 0
+
+    def _floor(self) -> int:
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(counter[0] for counter in self.counters.values())
+
+    def add(self, key: str, count: int = 1, label: Optional[str] = None):
+        self.total += count
+        counter = self.counters.get(key)
+        if counter is None:
+            if len(self.counters) >= self.capacity:
+                evicted = min(self.counters, key=lambda candidate: self.counters[candidate][0])
+                floor = self.counters.pop(evicted)[0]
+                self.labels.pop(evicted, None)
+                counter = self.counters[key] = [floor, floor]
+            else:
+                counter = self.counters[key] = [0, 0]
+        counter[0] += count
+        if label is not None:
+            self.labels.setdefault(key, label)
+
+    def merge(self, other: "SpaceSaving"):
+        own_floor, other_floor = self._floor(), other._floor()
+        merged = {}
+        for key in self.counters.keys() | other.counters.keys():
+            own = self.counters.get(key, [own_floor, own_floor])
+            theirs = other.counters.get(key, [other_floor, other_floor])
+            merged[key] = [own[0] + theirs[0], own[1] + theirs[1]]
+        kept = sorted(merged, key=lambda key: merged[key][0], reverse=True)[:self.capacity]
+        self.labels = {key: self.labels.get(key) or other.labels.get(key) for key in kept}
+        self.counters = {key: merged[key] for key in kept}
+        self.total += other.total
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        ranked = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        return [
+            {"query": self.labels.get(key) or key, "count": count, "error": error}
+            for key, (count, error) in ranked
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "counters": [[key, count, error, self.labels.get(key)] for key, (count, error) in self.counters.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], capacity: Optional[int] = None) -> "SpaceSaving":
+        summary = cls(capacity or data["capacity"])
+        summary.total = data["total"]
+        for key, count, error, label in data["counters"]:
+            summary.counters[key] = [count, error]
+            if label is not None:
+                summary.labels[key] = label
+        return summary
+
+def bucket_start(moment: datetime, resolution: str) -> datetime:
+    moment = moment.astimezone(timezone.utc).replace(second=0, microsecond=0)
+    return moment.replace(minute=0) if resolution == "hour" else moment
+
+def worker_source() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+RollupKey = Tuple[str, datetime, str, str, str]
+
+class LatencyRecorder:
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._sketches: Dict[RollupKey, QuantileSketch] = {}
+        self._versions: Dict[RollupKey, int] = {}
+        self._flushed: Dict[RollupKey, int] = {}
+
+    @property
+    def source(self) -> str:
+        return worker_source()
+
+    def record(self, stage: str, seconds: float, endpoint: Optional[str] = None, mode: Optional[str] = None):
+        if endpoint is None:
+            endpoint, mode = current_endpoint.get()
+        now = datetime.now(timezone.utc)
+        for resolution in RESOLUTIONS:
+            key = (resolution, bucket_start(now, resolution), endpoint, mode or "none", stage)
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                sketch = self._sketches[key] = QuantileSketch(self.relative_accuracy)
+            sketch.add(seconds)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def pending(self) -> List[Tuple[RollupKey, int, Dict[str, Any]]]:
+        return [
+            (key, version, self._sketches[key].to_dict())
+            for key, version in self._versions.items()
+            if self._flushed.get(key) != version
+        ]
+
+    def mark_flushed(self, flushed: List[Tuple[RollupKey, int, Dict[str, Any]]], now: Optional[datetime] = None):
+        now = now or datetime.now(timezone.utc)
+        for key, version, _ in flushed:
+            self._flushed[key] = version
+            resolution, start = key[0], key[1]
+            if start + RESOLUTIONS[resolution] <= now and self._versions.get(key) == version:
+                self._sketches.pop(key, None)
+                self._versions.pop(key, None)
+                self._flushed.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        unflushed = sum(1 for key, version in self._versions.items() if self._flushed.get(key) != version)
+        return {"source": self.source, "open_buckets": len(self._sketches), "unflushed": unflushed}
+
+latency_recorder = LatencyRecorder(settings.LATENCY_SKETCH_ACCURACY)
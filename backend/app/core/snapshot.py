@@ -0,0 +1,28 @@
+from typing import Any, Callable, Dict, Tuple
+import os
+import pickle
+import tempfile
+
+_providers: Dict[str, Tuple[Callable[[], Any], Callable[[Any], None]]] = {}
+
+def register(name: str, dump: Callable[[], Any], load: Callable[[Any], None]):
+    _providers[name] = (dump, load)
+
+def save(path: str):
+    data = {name: dump() for name, (dump, _) in _providers.items()}
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as temp_file:
+        pickle.dump(data, temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+        temp_path = temp_file.name
+    os.replace(temp_path, path)
+
+def load(path: str) -> bool:
+    if not path or not os.path.exists(path):
+        return False
+    with open(path, "rb") as snapshot_file:
+        data = pickle.load(snapshot_file)
+    for name, (_, load_fn) in _providers.items():
+        if name in data:
+            load_fn(data[name])
+    return True
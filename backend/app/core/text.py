@@ -0,0 +1,17 @@
+import base64
+import hashlib
+import re
+import zlib
+
+def normalize_query(query: str) -> str:
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return re.sub(r"\s+", " ", query).strip()
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def compress_text(text: str) -> str:
+    return base64.b64encode(zlib.compress(text.encode("utf-8"), 6)).decode("ascii")
+
+def decompress_text(data: str) -> str:
+    return zlib.decompress(base64.b64decode(data)).decode("utf-8")
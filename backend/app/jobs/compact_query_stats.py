@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta, timezone
+import argparse
+import asyncio
+from ..core.config import settings
+from ..core.sketches import SpaceSaving
+from ..services import supabase_service
+
+async def compact(retention_days: int) -> int:
+    before = datetime.now(timezone.utc).date() - timedelta(days=retention_days)
+    day_rows = await supabase_service.get_query_stats(before=before)
+    if not day_rows:
+        return 0
+
+    total_row = await supabase_service.get_query_stats_total()
+    total = SpaceSaving(settings.QUERY_STATS_CAPACITY)
+    if total_row:
+        total.merge(SpaceSaving.from_dict(total_row["sketch"], settings.QUERY_STATS_CAPACITY))
+    for row in day_rows:
+        total.merge(SpaceSaving.from_dict(row["sketch"], settings.QUERY_STATS_CAPACITY))
+
+    await supabase_service.save_query_stats_total(total.to_dict(), row_id=total_row["id"] if total_row else None)
+    ids = [row["id"] for row in day_rows]
+    for start in range(0, len(ids), 200):
+        await supabase_service.delete_query_stats(ids[start:start + 200])
+    return len(day_rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold daily top-query summaries older than the retention window into the all-time summary")
+    parser.add_argument("--retention-days", type=int, default=settings.QUERY_STATS_DAILY_RETENTION_DAYS, help="Keep daily summaries for this many days")
+    args = parser.parse_args()
+    compacted = asyncio.run(compact(args.retention_days))
+    print(f"Compacted {compacted} daily summaries")
@@ -0,0 +1,112 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Set
+import argparse
+import asyncio
+from ..services import supabase_service, pinecone_service
+
+def document_id_of(vector_id: str) -> str:
+    return vector_id.rsplit("_chunk_", 1)[0]
+
+async def load_documents() -> Set[str]:
+    return {row["id"] async for row in supabase_service.iter_document_summaries()}
+
+async def load_registry() -> List[Dict[str, Any]]:
+    return [row async for row in supabase_service.iter_document_vectors()]
+
+async def load_index() -> Dict[str, Set[str]]:
+    namespaces = await pinecone_service.list_namespaces()
+    ids = await asyncio.gather(*[pinecone_service.list_vector_ids(namespace) for namespace in namespaces])
+    return {namespace: set(namespace_ids) for namespace, namespace_ids in zip(namespaces, ids)}
+
+def is_content_addressed(vector_id: str) -> bool:
+    return vector_id.startswith("chunk_")
+
+def plan(
+    documents: Set[str],
+    registry: List[Dict[str, Any]],
+    index: Dict[str, Set[str]],
+    settled_before: datetime
+) -> Dict[str, Any]:
+    registered = {(row["namespace"], row["vector_id"]) for row in registry}
+    live_references = defaultdict(set)
+    stale_entries = []
+    missing_vectors = []
+
+    for row in registry:
+        settled = datetime.fromisoformat(row["created_at"]) <= settled_before
+        if row["document_id"] in documents:
+            live_references[(row["namespace"], row["vector_id"])].add(row["document_id"])
+            if settled and row["vector_id"] not in index.get(row["namespace"], set()):
+                missing_vectors.append(row)
+        elif settled:
+            stale_entries.append(row["id"])
+        else:
+            live_references[(row["namespace"], row["vector_id"])].add(row["document_id"])
+
+    dead_vectors = defaultdict(list)
+    unregistered = []
+    indexed_documents = set()
+
+    for namespace, ids in index.items():
+        for vector_id in ids:
+            if is_content_addressed(vector_id):
+                owners = live_references.get((namespace, vector_id))
+                if owners:
+                    indexed_documents.update(owners)
+                else:
+                    dead_vectors[namespace].append(vector_id)
+                continue
+
+            doc_id = document_id_of(vector_id)
+            if doc_id not in documents:
+                dead_vectors[namespace].append(vector_id)
+                continue
+            indexed_documents.add(doc_id)
+            if (namespace, vector_id) not in registered:
+                unregistered.append({"document_id": doc_id, "vector_id": vector_id, "namespace": namespace})
+
+    return {
+        "dead_vectors": dict(dead_vectors),
+        "unregistered": unregistered,
+        "stale_entries": stale_entries,
+        "missing_vectors": missing_vectors,
+        "documents_without_vectors": sorted(documents - indexed_documents)
+    }
+
+async def apply(actions: Dict[str, Any], batch_size: int = 500):
+    for namespace, ids in actions["dead_vectors"].items():
+        await pinecone_service.delete_vectors(ids, namespace=namespace)
+
+    unregistered = actions["unregistered"]
+    for start in range(0, len(unregistered), batch_size):
+        await supabase_service.register_document_vectors(unregistered[start:start + batch_size])
+
+    stale_entries = actions["stale_entries"]
+    for start in range(0, len(stale_entries), batch_size):
+        await supabase_service.delete_document_vector_entries(stale_entries[start:start + batch_size])
+
+async def main(dry_run: bool, grace_minutes: int):
+    settled_before = datetime.now(timezone.utc) - timedelta(minutes=grace_minutes)
+    index = await load_index()
+    registry = await load_registry()
+    documents = await load_documents()
+    actions = plan(documents, registry, index, settled_before)
+
+    print(f"Dead vectors: {sum(len(ids) for ids in actions['dead_vectors'].values())}")
+    print(f"Unregistered vectors: {len(actions['unregistered'])}")
+    print(f"Stale registry entries: {len(actions['stale_entries'])}")
+    print(f"Registered vectors missing from the index: {len(actions['missing_vectors'])}")
+    print(f"Documents without vectors: {len(actions['documents_without_vectors'])}")
+    for doc_id in actions["documents_without_vectors"]:
+        print(f"  {doc_id}")
+
+    if not dry_run:
+        await apply(actions)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile the vector registry with the Pinecone index and documents table")
+    parser.add_argument("--dry-run", action="store_true", help="Report differences without changing anything")
+    parser.add_argument("--grace-minutes", type=int, default=10, help="Leave registry entries newer than this alone while uploads settle")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run, args.grace_minutes))
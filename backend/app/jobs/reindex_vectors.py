@@ -0,0 +1,144 @@
+from collections import defaultdict
+from typing import Dict, List, Any, Tuple
+import argparse
+import asyncio
+from ..core.config import settings
+from ..core.request_context import Priority, current_priority, current_user_id
+from ..services import supabase_service, openai_service, pinecone_service, document_processor, index_manager
+from ..services.pinecone_service import namespace_for, chunk_vector_id
+from ..services.supabase_service import document_text
+
+async def prepare(name: str, embedding_model: str, dimension: int) -> Dict[str, Any]:
+    await index_manager.refresh()
+    if name == index_manager.active["name"]:
+        raise SystemExit(f"{name} is already the active index")
+
+    building = index_manager.building
+    if building and building["name"] != name:
+        raise SystemExit(f"Another migration into {building['name']} is in progress; finish or abort it first")
+    if building:
+        if (building["embedding_model"], building["dimension"]) != (embedding_model, dimension):
+            raise SystemExit(f"{name} is being built with {building['embedding_model']} ({building['dimension']})")
+        return building
+
+    indexes = await supabase_service.get_vector_indexes()
+    if not any(row["status"] == "active" for row in indexes):
+        active = index_manager.active
+        await supabase_service.create_vector_index(active["name"], active["embedding_model"], active["dimension"], "active")
+    building = await supabase_service.create_vector_index(name, embedding_model, dimension, "building")
+    await index_manager.refresh()
+
+    print(f"Waiting {settings.VECTOR_INDEX_REFRESH_SECONDS}s for API workers to start dual-writing into {name}")
+    await asyncio.sleep(settings.VECTOR_INDEX_REFRESH_SECONDS)
+    return building
+
+async def reindex_page(documents: List[Dict[str, Any]], spec: Dict[str, Any], semaphore: asyncio.Semaphore) -> int:
+    pending: Dict[str, Dict[str, Tuple[str, int, Dict[str, Any]]]] = defaultdict(dict)
+    references = {}
+    for document in documents:
+        namespace = namespace_for(document["category"])
+        for chunk_index, chunk in enumerate(document_processor.chunk_text(document_text(document))):
+            vector_id = chunk_vector_id(chunk)
+            pending[namespace].setdefault(vector_id, (chunk, chunk_index, document))
+            references.setdefault((document["id"], vector_id), {
+                "document_id": document["id"],
+                "vector_id": vector_id,
+                "namespace": namespace,
+                "chunk_index": chunk_index
+            })
+
+    written = 0
+
+    async def embed_batch(namespace: str, batch: List[Tuple[str, Tuple[str, int, Dict[str, Any]]]]):
+        nonlocal written
+        async with semaphore:
+            embeddings = await openai_service.create_embeddings_batch(
+                [chunk for _, (chunk, _, _) in batch],
+                model=spec["embedding_model"],
+                dimensions=spec["dimension"]
+            )
+            vectors = [
+                pinecone_service.build_vector(chunk, embedding, {
+                    "doc_id": document["id"],
+                    "title": document["title"],
+                    "category": document["category"],
+                    "chunk_index": chunk_index
+                })
+                for (_, (chunk, chunk_index, document)), embedding in zip(batch, embeddings)
+            ]
+            await pinecone_service.upsert_vectors(vectors, namespace=namespace, shadow=True)
+            written += len(vectors)
+
+    batches = []
+    for namespace, chunks in pending.items():
+        present = set(await pinecone_service.existing_ids(list(chunks), namespace, shadow=True))
+        missing = [(vector_id, chunk) for vector_id, chunk in chunks.items() if vector_id not in present]
+        batches.extend(
+            (namespace, missing[start:start + settings.EMBEDDING_BATCH_SIZE])
+            for start in range(0, len(missing), settings.EMBEDDING_BATCH_SIZE)
+        )
+
+    await asyncio.gather(*[embed_batch(namespace, batch) for namespace, batch in batches])
+
+    rows = list(references.values())
+    for start in range(0, len(rows), 500):
+        await supabase_service.register_document_vectors(rows[start:start + 500])
+    return written
+
+async def run(name: str, embedding_model: str, dimension: int, switch: bool, rescan: bool = False):
+    current_priority.set(Priority.BULK)
+    current_user_id.set("reindex")
+
+    spec = await prepare(name, embedding_model, dimension)
+    semaphore = asyncio.Semaphore(settings.REINDEX_CONCURRENCY)
+    cursor = None if rescan else spec.get("checkpoint")
+    documents_done = 0 if rescan else spec.get("documents_done") or 0
+    vectors_written = 0 if rescan else spec.get("vectors_written") or 0
+    if cursor:
+        print(f"Resuming after {documents_done} documents")
+
+    while True:
+        documents = await supabase_service.get_documents_after(cursor, settings.REINDEX_PAGE_SIZE)
+        if not documents:
+            break
+
+        vectors_written += await reindex_page(documents, spec, semaphore)
+        documents_done += len(documents)
+        cursor = [documents[-1]["uploaded_at"], documents[-1]["id"]]
+        await supabase_service.update_vector_index(name, {
+            "checkpoint": cursor,
+            "documents_done": documents_done,
+            "vectors_written": vectors_written
+        })
+        print(f"{documents_done} documents, {vectors_written} vectors written")
+
+    print(f"{name} is up to date with {documents_done} documents")
+    if switch:
+        await supabase_service.activate_vector_index(name)
+        print(f"{name} is now the active index; API workers switch within {settings.VECTOR_INDEX_REFRESH_SECONDS}s")
+
+async def activate(name: str):
+    await supabase_service.activate_vector_index(name)
+    print(f"{name} is now the active index")
+
+async def abort(name: str):
+    await supabase_service.update_vector_index(name, {"status": "retired"})
+    print(f"Stopped dual-writing into {name}; delete the Pinecone index manually if it is no longer needed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-embed every document into a new Pinecone index and switch reads to it")
+    parser.add_argument("index", help="Name of the Pinecone index to build")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL, help="Embedding model for the new index")
+    parser.add_argument("--dimension", type=int, default=settings.EMBEDDING_DIMENSION, help="Embedding dimension for the new index")
+    parser.add_argument("--switch", action="store_true", help="Make the new index active once every document is indexed")
+    parser.add_argument("--rescan", action="store_true", help="Ignore the checkpoint and check every document again, embedding only missing vectors")
+    parser.add_argument("--activate", action="store_true", help="Only switch reads to an already built index")
+    parser.add_argument("--abort", action="store_true", help="Stop building the index and dual-writing into it")
+    args = parser.parse_args()
+
+    if args.activate:
+        asyncio.run(activate(args.index))
+    elif args.abort:
+        asyncio.run(abort(args.index))
+    else:
+        asyncio.run(run(args.index, args.model, args.dimension, args.switch, args.rescan))
@@ -0,0 +1,113 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Tuple
+import argparse
+import asyncio
+import numpy as np
+from ..core.config import settings
+from ..core.request_context import Priority, current_priority, current_user_id
+from ..core.text import normalize_query
+from ..services import supabase_service, openai_service, rag_service
+
+async def mine_frequent_queries() -> Tuple[Counter, Dict[str, str]]:
+    since = datetime.now(timezone.utc) - timedelta(days=settings.ANSWER_WARMUP_LOOKBACK_DAYS)
+    counts = Counter()
+    examples = {}
+    async for row in supabase_service.iter_analytics_queries(since):
+        key = normalize_query(row.get("query") or "")
+        if key:
+            counts[key] += 1
+            examples.setdefault(key, row["query"])
+    frequent = Counter({
+        key: count for key, count in counts.most_common(settings.ANSWER_WARMUP_MAX_CANDIDATES)
+        if count >= settings.ANSWER_WARMUP_MIN_COUNT
+    })
+    return frequent, examples
+
+async def embed_all(texts: List[str]) -> np.ndarray:
+    batch_size = settings.EMBEDDING_BATCH_SIZE
+    embeddings = []
+    for start in range(0, len(texts), batch_size):
+        embeddings.extend(await openai_service.create_embeddings_batch(texts[start:start + batch_size]))
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+def cluster_near_duplicates(keys: List[str], counts: Counter, vectors: np.ndarray) -> List[Dict[str, Any]]:
+    clusters = []
+    representatives = []
+    for i, key in enumerate(keys):
+        if representatives:
+            similarities = vectors[representatives] @ vectors[i]
+            best = int(np.argmax(similarities))
+            if similarities[best] >= settings.ANSWER_WARMUP_SIMILARITY:
+                clusters[best]["variants"].append(key)
+                clusters[best]["hits"] += counts[key]
+                continue
+        representatives.append(i)
+        clusters.append({"key": key, "index": i, "variants": [], "hits": counts[key]})
+    return sorted(clusters, key=lambda cluster: cluster["hits"], reverse=True)
+
+async def precompute(cluster: Dict[str, Any], query: str, embedding: List[float]) -> Optional[Dict[str, Any]]:
+    if not await openai_service.check_ca_relevance(query):
+        return None
+
+    matches = await rag_service.retrieve(embedding)
+    answer = await openai_service.generate_chat_response(
+        prompt=query,
+        context=rag_service.build_context(matches)
+    )
+
+    now = datetime.now(timezone.utc)
+    return {
+        "query_key": cluster["key"],
+        "mode": "qa",
+        "query": query,
+        "variants": cluster["variants"],
+        "answer": answer,
+        "source_doc_ids": sorted({match["metadata"]["doc_id"] for match in matches if match["metadata"].get("doc_id")}),
+        "hits": cluster["hits"],
+        "refreshed_at": now.isoformat(),
+        "expires_at": (now + timedelta(hours=settings.ANSWER_TTL_HOURS)).isoformat()
+    }
+
+async def run_warmup() -> int:
+    current_priority.set(Priority.BULK)
+    current_user_id.set("answer-warmup")
+
+    counts, examples = await mine_frequent_queries()
+    if not counts:
+        return 0
+
+    keys = [key for key, _ in counts.most_common()]
+    vectors = await embed_all([examples[key] for key in keys])
+    clusters = cluster_near_duplicates(keys, counts, vectors)[:settings.ANSWER_WARMUP_TOP_N]
+
+    semaphore = asyncio.Semaphore(settings.ANSWER_WARMUP_CONCURRENCY)
+
+    async def process(cluster):
+        async with semaphore:
+            try:
+                return await precompute(cluster, examples[cluster["key"]], vectors[cluster["index"]].tolist())
+            except Exception as e:
+                print(f"Failed to precompute '{cluster['key']}': {str(e)}")
+                return None
+
+    answers = [answer for answer in await asyncio.gather(*[process(cluster) for cluster in clusters]) if answer]
+    if answers:
+        await supabase_service.upsert_precomputed_answers(answers)
+    await supabase_service.delete_expired_precomputed_answers()
+    return len(answers)
+
+async def main(loop: bool):
+    while True:
+        count = await run_warmup()
+        print(f"Precomputed {count} answers")
+        if not loop:
+            break
+        await asyncio.sleep(settings.ANSWER_WARMUP_INTERVAL_SECONDS)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute answers for frequent queries")
+    parser.add_argument("--loop", action="store_true", help="Keep refreshing on ANSWER_WARMUP_INTERVAL_SECONDS")
+    args = parser.parse_args()
+    asyncio.run(main(args.loop))
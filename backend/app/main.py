@@ -1,12 +1,18 @@
 from fastapi import FastAPI
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
+from .core.compression import CompressionMiddleware
 from .core.config import settings
+from .core.uploads import UploadSizeLimitMiddleware, MULTIPART_OVERHEAD
+from .core.profiling import ProfilingMiddleware, loop_monitor
+from .services import answer_store, latency_metrics, query_stats, index_manager, profile_store, chunk_sync
 from .api.endpoints import (
     auth_router,
     documents_router,
     chat_router,
     voice_router,
-    analytics_router
+    analytics_router,
+    admin_router
 )
 
 app = FastAPI(
@@ -15,12 +21,30 @@ app = FastAPI(
     version="1.0.0"
 )
 
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/documents/upload": settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD,
+        "/documents/bulk-upload": settings.BULK_UPLOAD_MAX_BYTES
+    }
+)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+)
+
+app.add_middleware(ProfilingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Transcript", "X-Conversation-Id", "X-Next-Cursor", "ETag", "X-Profile-Id"],
 )
 
 app.include_router(auth_router)
@@ -28,6 +52,67 @@ app.include_router(documents_router)
 app.include_router(chat_router)
 app.include_router(voice_router)
 app.include_router(analytics_router)
+app.include_router(admin_router)
+
+@app.on_event("startup")
+async def start_index_manager():
+    try:
+        await index_manager.refresh()
+    except Exception:
+        index_manager.failures += 1
+    app.state.index_manager_task = asyncio.create_task(index_manager.run_refresh_loop())
+
+@app.on_event("shutdown")
+async def stop_index_manager():
+    app.state.index_manager_task.cancel()
+
+@app.on_event("startup")
+async def start_chunk_sync():
+    app.state.chunk_sync_task = asyncio.create_task(chunk_sync.run_sync_loop())
+
+@app.on_event("shutdown")
+async def stop_chunk_sync():
+    app.state.chunk_sync_task.cancel()
+
+@app.on_event("startup")
+async def start_answer_store():
+    app.state.answer_store_task = asyncio.create_task(answer_store.run_refresh_loop())
+
+@app.on_event("shutdown")
+async def stop_answer_store():
+    app.state.answer_store_task.cancel()
+
+@app.on_event("startup")
+async def start_latency_metrics():
+    app.state.latency_metrics_task = asyncio.create_task(latency_metrics.run_flush_loop())
+    app.state.query_stats_task = asyncio.create_task(query_stats.run_flush_loop())
+
+@app.on_event("shutdown")
+async def stop_latency_metrics():
+    app.state.latency_metrics_task.cancel()
+    app.state.query_stats_task.cancel()
+    try:
+        await latency_metrics.flush()
+        await query_stats.flush()
+    except Exception:
+        pass
+
+@app.on_event("startup")
+async def start_profiling():
+    app.state.profiling_tasks = []
+    if settings.PROFILING_ENABLED or settings.LOOP_MONITOR_ENABLED:
+        app.state.profiling_tasks.append(asyncio.create_task(profile_store.run_flush_loop()))
+    if settings.LOOP_MONITOR_ENABLED:
+        app.state.profiling_tasks.append(asyncio.create_task(loop_monitor.run()))
+
+@app.on_event("shutdown")
+async def stop_profiling():
+    for task in app.state.profiling_tasks:
+        task.cancel()
+    try:
+        await profile_store.flush()
+    except Exception:
+        pass
 
 @app.get("/")
 async def root():
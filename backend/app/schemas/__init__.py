@@ -1,3 +1,3 @@
 from .user import UserCreate, UserLogin, UserResponse, Token
-from .document import DocumentCreate, DocumentResponse, DocumentUpdate
-from .chat import ChatRequest, ChatResponse, VoiceRequest, TTSRequest, ChatHistory, DiscussionPart
+from .document import DocumentCreate, DocumentResponse, DocumentUpdate, BulkUploadResult, BulkUploadResponse
+from .chat import ChatRequest, ChatResponse, VoiceRequest, TTSRequest, ChatHistory, ChatHistoryPreview, DiscussionPart
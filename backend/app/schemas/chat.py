@@ -7,6 +7,7 @@ class ChatRequest(BaseModel):
     mode: str = "qa"
     language: str = "en"
     conversation_id: Optional[str] = None
+    category: Optional[str] = None
 
 class DiscussionPart(BaseModel):
     speaker: str
@@ -38,3 +39,12 @@ class ChatHistory(BaseModel):
 
     class Config:
         from_attributes = True
+
+class ChatHistoryPreview(BaseModel):
+    id: str
+    user_id: str
+    conversation_id: str
+    message: str
+    preview: str
+    mode: str
+    timestamp: datetime
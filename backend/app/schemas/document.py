@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class DocumentBase(BaseModel):
@@ -23,3 +23,18 @@ class DocumentUpdate(BaseModel):
     title: Optional[str] = None
     category: Optional[str] = None
     content: Optional[str] = None
+
+class BulkUploadResult(BaseModel):
+    filename: str
+    status: str
+    document_id: Optional[str] = None
+    chunks: int = 0
+    reused_chunks: int = 0
+    error: Optional[str] = None
+
+class BulkUploadResponse(BaseModel):
+    total: int
+    succeeded: int
+    duplicates: int = 0
+    failed: int
+    results: List[BulkUploadResult]
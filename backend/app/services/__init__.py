@@ -1,4 +1,18 @@
 from .supabase_service import supabase_service
+from .llm_scheduler import llm_scheduler
 from .openai_service import openai_service
+from .chunk_store import chunk_store
+from .chunk_sync import chunk_sync
 from .pinecone_service import pinecone_service
+from .vector_registry import vector_registry
+from .index_manager import index_manager
 from .document_processor import document_processor
+from .audio_processor import audio_processor
+from .answer_store import answer_store
+from .conversation_memory import conversation_memory
+from .latency_metrics import latency_metrics
+from .query_stats import query_stats
+from .rag_service import rag_service
+from .ingestion_service import ingestion_service
+from .profile_store import profile_store
+from .export_service import export_service
@@ -0,0 +1,61 @@
+from typing import Dict, List, Optional, Tuple, Any
+from datetime import datetime, timezone
+import asyncio
+from ..core import snapshot
+from ..core.config import settings
+from .supabase_service import supabase_service
+from ..core.text import normalize_query
+
+class AnswerStore:
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._rows: List[Dict[str, Any]] = []
+
+    def get(self, message: str, mode: str = "qa") -> Optional[Dict[str, Any]]:
+        entry = self._entries.get((mode, normalize_query(message)))
+        if entry is None:
+            return None
+        if entry["expires_at"] <= datetime.now(timezone.utc):
+            self._entries.pop((mode, normalize_query(message)), None)
+            return None
+        return entry
+
+    def load(self, rows: List[Dict[str, Any]]):
+        entries = {}
+        for row in rows:
+            entry = {
+                **row,
+                "expires_at": datetime.fromisoformat(row["expires_at"]),
+                "source_doc_ids": set(row.get("source_doc_ids") or [])
+            }
+            for key in [row["query_key"], *(row.get("variants") or [])]:
+                entries[(row["mode"], key)] = entry
+        self._entries = entries
+        self._rows = rows
+
+    async def refresh(self):
+        rows = await supabase_service.get_precomputed_answers()
+        self.load(rows)
+
+    async def invalidate_documents(self, doc_ids: List[str]):
+        stale = set(doc_ids)
+        self._rows = [row for row in self._rows if not set(row.get("source_doc_ids") or []) & stale]
+        self._entries = {
+            key: entry for key, entry in self._entries.items()
+            if not entry["source_doc_ids"] & stale
+        }
+        await supabase_service.delete_precomputed_answers_for_documents(doc_ids)
+
+    async def run_refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                pass
+            await asyncio.sleep(settings.ANSWER_STORE_REFRESH_SECONDS)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len({id(entry) for entry in self._entries.values()}), "keys": len(self._entries)}
+
+answer_store = AnswerStore()
+snapshot.register("answer_store", lambda: answer_store._rows, answer_store.load)
@@ -0,0 +1,75 @@
+from typing import List, Tuple, Optional
+from pydub import AudioSegment
+from pydub.silence import detect_silence
+import io
+
+AUDIO_FORMATS = {
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "audio/wav": "wav",
+    "audio/webm": "webm",
+    "audio/ogg": "ogg",
+    "audio/m4a": "m4a"
+}
+
+class AudioProcessor:
+    @staticmethod
+    def get_format(filename: Optional[str], content_type: Optional[str]) -> str:
+        if filename and "." in filename:
+            file_ext = filename.lower().rsplit(".", 1)[-1]
+            if file_ext in AUDIO_FORMATS.values():
+                return file_ext
+        return AUDIO_FORMATS.get(content_type, "webm")
+
+    @staticmethod
+    def _find_split_points(
+        audio: AudioSegment,
+        max_segment_ms: int,
+        min_silence_ms: int,
+        silence_thresh_db: int
+    ) -> List[int]:
+        silences = detect_silence(
+            audio,
+            min_silence_len=min_silence_ms,
+            silence_thresh=audio.dBFS - silence_thresh_db
+        )
+        candidates = [(start + end) // 2 for start, end in silences]
+
+        points = []
+        segment_start = 0
+        while len(audio) - segment_start > max_segment_ms:
+            limit = segment_start + max_segment_ms
+            window = [p for p in candidates if segment_start + max_segment_ms // 2 <= p <= limit]
+            split_point = window[-1] if window else limit
+            points.append(split_point)
+            segment_start = split_point
+
+        return points
+
+    @staticmethod
+    def split_on_silence(
+        file_content: bytes,
+        audio_format: str,
+        max_segment_ms: int = 10 * 60 * 1000,
+        min_silence_ms: int = 700,
+        silence_thresh_db: int = 16
+    ) -> List[Tuple[str, bytes, str]]:
+        try:
+            audio = AudioSegment.from_file(io.BytesIO(file_content), format=audio_format)
+        except Exception as e:
+            raise Exception(f"Failed to decode audio: {str(e)}")
+
+        split_points = AudioProcessor._find_split_points(
+            audio, max_segment_ms, min_silence_ms, silence_thresh_db
+        )
+        boundaries = [0] + split_points + [len(audio)]
+
+        segments = []
+        for i in range(len(boundaries) - 1):
+            buffer = io.BytesIO()
+            audio[boundaries[i]:boundaries[i + 1]].export(buffer, format="mp3", bitrate="64k")
+            segments.append((f"segment_{i}.mp3", buffer.getvalue(), "audio/mpeg"))
+
+        return segments
+
+audio_processor = AudioProcessor()
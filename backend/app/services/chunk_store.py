@@ -0,0 +1,184 @@
+from typing import Dict, List, Optional, Tuple, Any
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+import orjson
+from ..core.config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    namespace TEXT NOT NULL,
+    vector_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (namespace, vector_id)
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_vector_id ON chunks(vector_id);
+CREATE TABLE IF NOT EXISTS chunk_vectors (
+    index_name TEXT NOT NULL,
+    vector_id TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    PRIMARY KEY (index_name, vector_id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    change_id INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+CHUNK_COLUMNS = ["namespace", "vector_id", "text", "metadata"]
+
+BATCH_SIZE = 500
+
+StoredChunk = Tuple[str, Dict[str, Any], Optional[np.ndarray]]
+
+class ChunkStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._readers = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            columns = [column[1] for column in connection.execute("PRAGMA table_info(chunks)")]
+            if columns and columns != CHUNK_COLUMNS:
+                connection.execute("DROP TABLE chunks")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+        return self._connection
+
+    def _read(self, query: str, params: List[Any]) -> List[Tuple[Any, ...]]:
+        if self.path == ":memory:":
+            connection = self._connect()
+            with self._lock:
+                return connection.execute(query, params).fetchall()
+
+        reader = getattr(self._readers, "connection", None)
+        if reader is None or self._readers.pid != os.getpid():
+            self._connect()
+            reader = sqlite3.connect(self.path, timeout=30)
+            reader.execute("PRAGMA query_only=ON")
+            self._readers.connection = reader
+            self._readers.pid = os.getpid()
+        return reader.execute(query, params).fetchall()
+
+    @staticmethod
+    def _placeholders(values: List[Any]) -> str:
+        return ",".join("?" * len(values))
+
+    def put_many(self, namespace: str, vectors: List[Dict[str, Any]], index_name: Optional[str] = None):
+        chunks = []
+        values = []
+        for vector in vectors:
+            metadata = dict(vector.get("metadata") or {})
+            text = metadata.pop("text", "")
+            chunks.append((namespace, vector["id"], text, orjson.dumps(metadata)))
+            if index_name and vector.get("values") is not None:
+                values.append((index_name, vector["id"], np.asarray(vector["values"], dtype=np.float32).tobytes()))
+
+        connection = self._connect()
+        with self._lock, connection:
+            connection.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)", chunks)
+            if values:
+                connection.executemany("INSERT OR REPLACE INTO chunk_vectors VALUES (?, ?, ?)", values)
+
+    def get_many(
+        self,
+        namespace: str,
+        ids: List[str],
+        index_name: Optional[str] = None
+    ) -> Dict[str, StoredChunk]:
+        if not ids:
+            return {}
+        rows = self._read(
+            f"SELECT vector_id, text, metadata FROM chunks WHERE namespace = ? AND vector_id IN ({self._placeholders(ids)})",
+            [namespace, *ids]
+        )
+        vectors = dict(self._read(
+            f"SELECT vector_id, vector FROM chunk_vectors WHERE index_name = ? AND vector_id IN ({self._placeholders(ids)})",
+            [index_name, *ids]
+        )) if index_name else {}
+
+        found = {
+            vector_id: (
+                text,
+                orjson.loads(metadata),
+                np.frombuffer(vectors[vector_id], dtype=np.float32) if vector_id in vectors else None
+            )
+            for vector_id, text, metadata in rows
+        }
+        self.hits += len(found)
+        self.misses += len(ids) - len(found)
+        return found
+
+    def update_metadata(self, namespace: str, ids: List[str], metadata: Dict[str, Any], target_namespace: Optional[str] = None):
+        connection = self._connect()
+        with self._lock, connection:
+            for start in range(0, len(ids), BATCH_SIZE):
+                batch = ids[start:start + BATCH_SIZE]
+                rows = connection.execute(
+                    f"SELECT vector_id, text, metadata FROM chunks WHERE namespace = ? AND vector_id IN ({self._placeholders(batch)})",
+                    [namespace, *batch]
+                ).fetchall()
+                connection.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)", [
+                    (target_namespace or namespace, vector_id, text, orjson.dumps({**orjson.loads(stored), **metadata}))
+                    for vector_id, text, stored in rows
+                ])
+
+    def delete(self, namespace: str, ids: List[str]):
+        connection = self._connect()
+        with self._lock, connection:
+            for start in range(0, len(ids), BATCH_SIZE):
+                batch = ids[start:start + BATCH_SIZE]
+                connection.execute(
+                    f"DELETE FROM chunks WHERE namespace = ? AND vector_id IN ({self._placeholders(batch)})",
+                    [namespace, *batch]
+                )
+                connection.execute(
+                    f"DELETE FROM chunk_vectors WHERE vector_id IN ({self._placeholders(batch)}) "
+                    "AND NOT EXISTS (SELECT 1 FROM chunks WHERE chunks.vector_id = chunk_vectors.vector_id)",
+                    batch
+                )
+
+    def forget_metadata(self, namespace: str, ids: List[str]):
+        connection = self._connect()
+        with self._lock, connection:
+            for start in range(0, len(ids), BATCH_SIZE):
+                batch = ids[start:start + BATCH_SIZE]
+                connection.execute(
+                    f"DELETE FROM chunks WHERE namespace = ? AND vector_id IN ({self._placeholders(batch)})",
+                    [namespace, *batch]
+                )
+
+    def clear_metadata(self):
+        connection = self._connect()
+        with self._lock, connection:
+            connection.execute("DELETE FROM chunks")
+
+    def sync_state(self) -> Tuple[Optional[int], Optional[float]]:
+        rows = self._read("SELECT change_id, synced_at FROM sync_state WHERE id = 1", [])
+        return rows[0] if rows else (None, None)
+
+    def set_sync_state(self, change_id: int):
+        connection = self._connect()
+        with self._lock, connection:
+            connection.execute("INSERT OR REPLACE INTO sync_state VALUES (1, ?, ?)", [change_id, time.time()])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "hits": self.hits, "misses": self.misses}
+
+chunk_store = ChunkStore(settings.CHUNK_STORE_PATH)
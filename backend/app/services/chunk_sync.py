@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any
+import asyncio
+import time
+from ..core.config import settings
+from .chunk_store import chunk_store
+from .supabase_service import supabase_service
+
+PAGE_SIZE = 500
+
+class ChunkSync:
+    def __init__(self):
+        self.applied = 0
+        self.resets = 0
+        self.failures = 0
+        self._pruned_at: Optional[datetime] = None
+
+    async def record(self, namespace: str, vector_ids: List[str]):
+        await supabase_service.log_vector_changes(namespace, vector_ids)
+
+    async def sync(self) -> int:
+        change_id, synced_at = await asyncio.to_thread(chunk_store.sync_state)
+        if change_id is None or time.time() - synced_at > settings.CHUNK_CHANGE_RETENTION_DAYS * 86400:
+            latest = await supabase_service.get_latest_vector_change_id()
+            await asyncio.to_thread(chunk_store.clear_metadata)
+            await asyncio.to_thread(chunk_store.set_sync_state, latest)
+            self.resets += 1
+            return 0
+
+        applied = 0
+        while True:
+            changes = await supabase_service.get_vector_changes_after(change_id, PAGE_SIZE)
+            for change in changes:
+                await asyncio.to_thread(chunk_store.forget_metadata, change["namespace"], change["vector_ids"])
+                applied += len(change["vector_ids"])
+            if changes:
+                change_id = changes[-1]["id"]
+            await asyncio.to_thread(chunk_store.set_sync_state, change_id)
+            if len(changes) < PAGE_SIZE:
+                break
+        self.applied += applied
+        return applied
+
+    async def prune(self):
+        now = datetime.now(timezone.utc)
+        await supabase_service.delete_vector_changes(now - timedelta(days=settings.CHUNK_CHANGE_RETENTION_DAYS))
+        self._pruned_at = now
+
+    async def run_sync_loop(self):
+        while True:
+            try:
+                await self.sync()
+                if self._pruned_at is None or datetime.now(timezone.utc) - self._pruned_at > timedelta(hours=1):
+                    await self.prune()
+            except Exception:
+                self.failures += 1
+            await asyncio.sleep(settings.CHUNK_SYNC_SECONDS)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"applied": self.applied, "resets": self.resets, "failures": self.failures}
+
+chunk_sync = ChunkSync()
@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import List, Dict, Optional, Set, Any
+import asyncio
+from ..core.config import settings
+from ..core.request_context import Priority, request_priority
+from .supabase_service import supabase_service
+from .openai_service import openai_service, estimate_tokens
+
+class ConversationMemory:
+    def __init__(self):
+        self._compacting: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.compactions = 0
+        self.failures = 0
+
+    async def get_messages(self, conversation_id: Optional[str]) -> List[Dict[str, str]]:
+        if not conversation_id:
+            return []
+
+        summary, turns = await asyncio.gather(
+            supabase_service.get_conversation_summary(conversation_id),
+            supabase_service.get_recent_turns(conversation_id, limit=settings.HISTORY_MAX_TURNS)
+        )
+        if summary:
+            summarized_through = datetime.fromisoformat(summary["summarized_through"])
+            turns = [turn for turn in turns if datetime.fromisoformat(turn["timestamp"]) > summarized_through]
+
+        budget = settings.HISTORY_TOKEN_BUDGET
+        messages = []
+        if summary and summary["summary"]:
+            summary_message = {"role": "system", "content": f"Summary of the earlier conversation:\n{summary['summary']}"}
+            budget -= estimate_tokens(summary_message["content"])
+        else:
+            summary_message = None
+
+        for turn in reversed(turns):
+            answer = turn["bot_response"]
+            cost = estimate_tokens(turn["message"]) + estimate_tokens(answer) + 8
+            if cost > budget:
+                if messages:
+                    break
+                answer = answer[:max(0, budget - estimate_tokens(turn["message"]) - 8) * 4]
+                cost = budget
+            messages[:0] = [
+                {"role": "user", "content": turn["message"]},
+                {"role": "assistant", "content": answer}
+            ]
+            budget -= cost
+
+        return [summary_message, *messages] if summary_message else messages
+
+    def schedule_compaction(self, conversation_id: str):
+        if conversation_id in self._compacting:
+            return
+        self._compacting.add(conversation_id)
+        task = asyncio.create_task(self._compact_in_background(conversation_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _compact_in_background(self, conversation_id: str):
+        try:
+            with request_priority(Priority.BULK):
+                while await self.compact(conversation_id):
+                    pass
+        except Exception:
+            self.failures += 1
+        finally:
+            self._compacting.discard(conversation_id)
+
+    async def compact(self, conversation_id: str) -> bool:
+        summary = await supabase_service.get_conversation_summary(conversation_id)
+        turns = await supabase_service.get_turns_after(
+            conversation_id,
+            after=summary["summarized_through"] if summary else None,
+            limit=settings.SUMMARY_BATCH_TURNS + settings.SUMMARY_KEEP_RECENT_TURNS
+        )
+
+        folded = turns[:-settings.SUMMARY_KEEP_RECENT_TURNS] if settings.SUMMARY_KEEP_RECENT_TURNS else turns
+        if len(folded) < settings.SUMMARY_MIN_TURNS:
+            return False
+
+        new_summary = await openai_service.summarize_conversation(
+            summary["summary"] if summary else "",
+            folded
+        )
+        saved = await supabase_service.save_conversation_summary(
+            conversation_id=conversation_id,
+            summary=new_summary,
+            summarized_through=folded[-1]["timestamp"],
+            summarized_turns=(summary["summarized_turns"] if summary else 0) + len(folded),
+            previous_turns=summary["summarized_turns"] if summary else None
+        )
+        if saved:
+            self.compactions += 1
+        return saved
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_progress": len(self._compacting),
+            "compactions": self.compactions,
+            "failures": self.failures
+        }
+
+conversation_memory = ConversationMemory()
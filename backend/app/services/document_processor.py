@@ -1,15 +1,55 @@
-from typing import List, Tuple
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Tuple, Union
 import PyPDF2
 import docx
 import io
+import os
 import re
+import uuid
+import zipfile
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+DocumentSource = Union[bytes, str, BinaryIO]
+
+DOCUMENT_TYPES = {
+    "pdf": "application/pdf",
+    "doc": "application/msword",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "txt": "text/plain"
+}
 
 class DocumentProcessor:
     @staticmethod
-    def extract_text_from_pdf(file_content: bytes) -> str:
+    @contextmanager
+    def open_source(source: DocumentSource) -> Iterator[BinaryIO]:
+        if isinstance(source, bytes):
+            yield io.BytesIO(source)
+        elif isinstance(source, str):
+            with open(source, "rb") as stream:
+                yield stream
+        else:
+            source.seek(0)
+            yield source
+
+    @staticmethod
+    def copy_stream(stream: BinaryIO, path: str, max_size: int) -> int:
+        copied = 0
+        with open(path, "wb") as target:
+            while True:
+                chunk = stream.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                copied += len(chunk)
+                if copied > max_size:
+                    raise ValueError("File exceeds the file size limit")
+                target.write(chunk)
+        return copied
+
+    @staticmethod
+    def extract_text_from_pdf(stream: BinaryIO) -> str:
         try:
-            pdf_file = io.BytesIO(file_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            pdf_reader = PyPDF2.PdfReader(stream)
             text = ""
             for page in pdf_reader.pages:
                 text += page.extract_text() + "\n"
@@ -18,19 +58,18 @@ class DocumentProcessor:
             raise Exception(f"Failed to extract text from PDF: {str(e)}")
 
     @staticmethod
-    def extract_text_from_docx(file_content: bytes) -> str:
+    def extract_text_from_docx(stream: BinaryIO) -> str:
         try:
-            doc_file = io.BytesIO(file_content)
-            doc = docx.Document(doc_file)
+            doc = docx.Document(stream)
             text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
             return text.strip()
         except Exception as e:
             raise Exception(f"Failed to extract text from DOCX: {str(e)}")
 
     @staticmethod
-    def extract_text_from_txt(file_content: bytes) -> str:
+    def extract_text_from_txt(stream: BinaryIO) -> str:
         try:
-            return file_content.decode("utf-8").strip()
+            return stream.read().decode("utf-8").strip()
         except Exception as e:
             raise Exception(f"Failed to extract text from TXT: {str(e)}")
 
@@ -66,19 +105,68 @@ class DocumentProcessor:
         return chunks
 
     @staticmethod
-    def process_file(file_content: bytes, filename: str) -> Tuple[str, List[str]]:
+    def process_file(source: DocumentSource, filename: str) -> Tuple[str, List[str]]:
         file_ext = filename.lower().split('.')[-1]
 
-        if file_ext == 'pdf':
-            text = DocumentProcessor.extract_text_from_pdf(file_content)
-        elif file_ext in ['docx', 'doc']:
-            text = DocumentProcessor.extract_text_from_docx(file_content)
-        elif file_ext == 'txt':
-            text = DocumentProcessor.extract_text_from_txt(file_content)
-        else:
-            raise ValueError(f"Unsupported file type: {file_ext}")
+        with DocumentProcessor.open_source(source) as stream:
+            if file_ext == 'pdf':
+                text = DocumentProcessor.extract_text_from_pdf(stream)
+            elif file_ext in ['docx', 'doc']:
+                text = DocumentProcessor.extract_text_from_docx(stream)
+            elif file_ext == 'txt':
+                text = DocumentProcessor.extract_text_from_txt(stream)
+            else:
+                raise ValueError(f"Unsupported file type: {file_ext}")
 
         chunks = DocumentProcessor.chunk_text(text)
         return text, chunks
 
+    @staticmethod
+    def extract_archive(
+        source: DocumentSource,
+        max_file_size: int,
+        directory: str,
+        max_files: int,
+        max_total_size: int
+    ) -> List[Tuple[str, str]]:
+        files = []
+        with DocumentProcessor.open_source(source) as stream:
+            try:
+                archive = zipfile.ZipFile(stream)
+            except zipfile.BadZipFile as e:
+                raise ValueError(f"Invalid zip archive: {str(e)}")
+
+            with archive:
+                members = []
+                for info in archive.infolist():
+                    filename = os.path.basename(info.filename)
+                    if info.is_dir() or not filename or filename.startswith("."):
+                        continue
+                    if filename.lower().split('.')[-1] not in DOCUMENT_TYPES:
+                        continue
+                    if info.file_size > max_file_size:
+                        raise ValueError(f"{info.filename} exceeds the file size limit")
+                    members.append(info)
+
+                if len(members) > max_files:
+                    raise ValueError(f"Archive holds {len(members)} documents but only {max_files} more fit in this upload")
+                if sum(info.file_size for info in members) > max_total_size:
+                    raise ValueError("Archive exceeds the total extracted size limit for this upload")
+
+                remaining = max_total_size
+                for info in members:
+                    path = os.path.join(directory, uuid.uuid4().hex)
+                    limit = min(max_file_size, remaining)
+                    try:
+                        with archive.open(info) as member:
+                            remaining -= DocumentProcessor.copy_stream(member, path, limit)
+                    except zipfile.BadZipFile as e:
+                        raise ValueError(f"Invalid zip archive: {str(e)}")
+                    except ValueError:
+                        if limit < max_file_size:
+                            raise ValueError("Archive exceeds the total extracted size limit for this upload")
+                        raise ValueError(f"{info.filename} exceeds the file size limit")
+                    files.append((info.filename, path))
+        return files
+
 document_processor = DocumentProcessor()
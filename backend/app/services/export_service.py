@@ -0,0 +1,107 @@
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Any
+import asyncio
+import csv
+import io
+import orjson
+from ..core.config import settings
+from .supabase_service import supabase_service
+
+EXPORT_DATASETS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "chats": ("timestamp", (
+        "id", "user_id", "conversation_id", "message", "bot_response", "bot_response_preview", "mode", "timestamp"
+    )),
+    "analytics": ("created_at", (
+        "id", "query", "response_time", "feedback", "model_tier", "model",
+        "prompt_tokens", "completion_tokens", "llm_latency", "created_at"
+    )),
+    "documents": ("uploaded_at", (
+        "id", "title", "category", "size", "type", "uploaded_by", "uploaded_at", "content_hash"
+    ))
+}
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+class ExportService:
+    def __init__(self):
+        self._slots = asyncio.Semaphore(settings.EXPORT_MAX_CONCURRENT)
+        self.exports = 0
+        self.rows = 0
+
+    def resolve_fields(self, dataset: str, fields: Optional[str]) -> List[str]:
+        if dataset not in EXPORT_DATASETS:
+            raise ValueError(f"Unknown dataset: {dataset}. Choose from {', '.join(EXPORT_DATASETS)}")
+        allowed = EXPORT_DATASETS[dataset][1]
+        if not fields:
+            return list(allowed)
+        selected = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+        unknown = [field for field in selected if field not in allowed]
+        if unknown or not selected:
+            raise ValueError(f"Unknown fields for {dataset}: {', '.join(unknown) or '(none)'}")
+        return selected
+
+    @property
+    def busy(self) -> bool:
+        return self._slots.locked()
+
+    def _fetch_page(
+        self,
+        dataset: str,
+        fields: List[str],
+        export_format: str,
+        cursor: Optional[List[str]],
+        start: Optional[datetime],
+        end: Optional[datetime]
+    ) -> Tuple[int, Optional[List[str]], bytes]:
+        order_column = EXPORT_DATASETS[dataset][0]
+        columns = list(dict.fromkeys(fields + [order_column, "id"]))
+        page = supabase_service.export_page_query(
+            dataset, columns, order_column, cursor, settings.EXPORT_PAGE_SIZE, start, end
+        ).execute().data
+
+        next_cursor = [page[-1][order_column], page[-1]["id"]] if page else None
+
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows([["" if row.get(field) is None else row[field] for field in fields] for row in page])
+            body = buffer.getvalue().encode("utf-8")
+        else:
+            body = b"".join(orjson.dumps({field: row.get(field) for field in fields}) + b"\n" for row in page)
+        return len(page), next_cursor, body
+
+    async def stream(
+        self,
+        dataset: str,
+        fields: List[str],
+        export_format: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> AsyncIterator[bytes]:
+        async with self._slots:
+            self.exports += 1
+            if export_format == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer).writerow(fields)
+                yield buffer.getvalue().encode("utf-8")
+
+            pending = asyncio.create_task(asyncio.to_thread(self._fetch_page, dataset, fields, export_format, None, start, end))
+            try:
+                while pending is not None:
+                    count, cursor, body = await pending
+                    pending = None
+                    if cursor is not None:
+                        pending = asyncio.create_task(asyncio.to_thread(
+                            self._fetch_page, dataset, fields, export_format, cursor, start, end
+                        ))
+                    self.rows += count
+                    if body:
+                        yield body
+            finally:
+                if pending is not None:
+                    pending.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"exports": self.exports, "rows": self.rows, "busy": self.busy}
+
+export_service = ExportService()
@@ -0,0 +1,51 @@
+from typing import Dict, Optional, Any
+import asyncio
+from ..core.config import settings
+from .supabase_service import supabase_service
+from .openai_service import openai_service
+from .pinecone_service import pinecone_service
+
+class IndexManager:
+    def __init__(self):
+        self.active: Dict[str, Any] = {
+            "name": settings.PINECONE_INDEX_NAME,
+            "embedding_model": settings.EMBEDDING_MODEL,
+            "dimension": settings.EMBEDDING_DIMENSION,
+            "status": "active"
+        }
+        self.building: Optional[Dict[str, Any]] = None
+        self.switches = 0
+        self.failures = 0
+        self.shadow_write_failures = 0
+
+    async def refresh(self):
+        rows = {row["status"]: row for row in await supabase_service.get_vector_indexes()}
+        active = rows.get("active", self.active)
+        if active["name"] != pinecone_service.index_name:
+            await pinecone_service.use_index(active["name"], active["dimension"])
+            self.switches += 1
+        openai_service.use_embedding_model(active["embedding_model"], active["dimension"])
+        self.active = active
+
+        self.building = rows.get("building")
+        await pinecone_service.use_shadow_index(self.building)
+
+    async def run_refresh_loop(self):
+        while True:
+            await asyncio.sleep(settings.VECTOR_INDEX_REFRESH_SECONDS)
+            try:
+                await self.refresh()
+            except Exception:
+                self.failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active["name"],
+            "embedding_model": self.active["embedding_model"],
+            "building": self.building["name"] if self.building else None,
+            "switches": self.switches,
+            "failures": self.failures,
+            "shadow_write_failures": self.shadow_write_failures
+        }
+
+index_manager = IndexManager()
@@ -0,0 +1,230 @@
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional
+import asyncio
+import os
+from ..core.config import settings
+from ..core.text import content_hash
+from .supabase_service import supabase_service, document_content_fields
+from .openai_service import openai_service
+from .pinecone_service import pinecone_service, namespace_for, chunk_vector_id
+from .vector_registry import vector_registry
+from .index_manager import index_manager
+from .document_processor import document_processor, DOCUMENT_TYPES
+
+class IngestionService:
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=settings.INGEST_EXTRACT_WORKERS or None)
+        return self._executor
+
+    async def _extract(self, files: List[Tuple[str, str]]) -> List[Any]:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        return await asyncio.gather(*[
+            loop.run_in_executor(executor, document_processor.process_file, path, filename)
+            for filename, path in files
+        ], return_exceptions=True)
+
+    async def index_documents(
+        self,
+        documents: List[Tuple[Dict[str, Any], List[str]]],
+        category: str
+    ) -> Tuple[Dict[str, str], Dict[str, int]]:
+        namespace = namespace_for(category)
+        references = []
+        needed_by = defaultdict(set)
+        unique_chunks = {}
+        for document, chunks in documents:
+            for chunk_index, chunk in enumerate(chunks):
+                vector_id = chunk_vector_id(chunk)
+                if document["id"] in needed_by[vector_id]:
+                    continue
+                needed_by[vector_id].add(document["id"])
+                references.append({
+                    "document_id": document["id"],
+                    "vector_id": vector_id,
+                    "namespace": namespace,
+                    "chunk_index": chunk_index
+                })
+                unique_chunks.setdefault(vector_id, (chunk, chunk_index, document))
+
+        try:
+            existing = set(await pinecone_service.existing_ids(list(unique_chunks), namespace))
+            for start in range(0, len(references), 500):
+                await supabase_service.register_document_vectors(references[start:start + 500])
+        except Exception as e:
+            return {document["id"]: f"Failed to register vectors: {str(e)}" for document, _ in documents}, {}
+
+        reused = defaultdict(int)
+        for vector_id, doc_ids in needed_by.items():
+            for doc_id in doc_ids:
+                if vector_id in existing or doc_id != unique_chunks[vector_id][2]["id"]:
+                    reused[doc_id] += 1
+
+        pending = [
+            (vector_id, chunk, chunk_index, document)
+            for vector_id, (chunk, chunk_index, document) in unique_chunks.items()
+            if vector_id not in existing
+        ]
+        batch_size = settings.EMBEDDING_BATCH_SIZE
+        batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+
+        failed = {}
+        semaphore = asyncio.Semaphore(settings.INGEST_EMBED_CONCURRENCY)
+
+        def build_vectors(batch, embeddings):
+            return [
+                pinecone_service.build_vector(chunk, embedding, {
+                    "doc_id": document["id"],
+                    "title": document["title"],
+                    "category": category,
+                    "chunk_index": chunk_index
+                })
+                for (_, chunk, chunk_index, document), embedding in zip(batch, embeddings)
+            ]
+
+        async def process_batch(batch):
+            async with semaphore:
+                try:
+                    texts = [chunk for _, chunk, _, _ in batch]
+                    embeddings = await openai_service.create_embeddings_batch(texts)
+                    await pinecone_service.upsert_vectors(build_vectors(batch, embeddings), namespace=namespace)
+                except Exception as e:
+                    for vector_id, _, _, _ in batch:
+                        for doc_id in needed_by[vector_id]:
+                            failed.setdefault(doc_id, str(e))
+                    return
+
+                shadow = pinecone_service.shadow
+                if shadow:
+                    try:
+                        shadow_embeddings = await openai_service.create_embeddings_batch(
+                            texts, model=shadow["embedding_model"], dimensions=shadow["dimension"]
+                        )
+                        await pinecone_service.upsert_vectors(
+                            build_vectors(batch, shadow_embeddings), namespace=namespace, shadow=True
+                        )
+                    except Exception:
+                        index_manager.shadow_write_failures += 1
+
+        await asyncio.gather(*[process_batch(batch) for batch in batches])
+        return failed, dict(reused)
+
+    async def ingest_files(
+        self,
+        files: List[Tuple[str, str]],
+        category: str,
+        uploaded_by: str
+    ) -> List[Dict[str, Any]]:
+        results = [
+            {"filename": filename, "status": "pending", "document_id": None, "chunks": 0, "reused_chunks": 0, "error": None}
+            for filename, _ in files
+        ]
+
+        extracted = await self._extract(files)
+
+        rows = []
+        row_files = []
+        file_texts = {}
+        file_chunks = {}
+        file_hashes = {}
+        for i, ((filename, path), outcome) in enumerate(zip(files, extracted)):
+            if isinstance(outcome, Exception):
+                results[i].update(status="failed", error=str(outcome))
+                continue
+
+            full_text, chunks = outcome
+            if not full_text or not chunks:
+                results[i].update(status="skipped", error="Could not extract text from the document")
+                continue
+
+            file_hashes[i] = content_hash(full_text)
+            file_texts[i] = full_text
+            file_chunks[i] = chunks
+
+        try:
+            existing = {
+                document["content_hash"]: document
+                for document in await supabase_service.find_documents_by_hash(list(set(file_hashes.values())), category)
+            } if file_hashes else {}
+        except Exception as e:
+            for i in file_hashes:
+                results[i].update(status="failed", error=f"Failed to check for duplicates: {str(e)}")
+            return results
+
+        first_with_hash = {}
+        duplicates_in_batch = {}
+        for i, digest in file_hashes.items():
+            filename, path = files[i]
+            if digest in existing:
+                results[i].update(status="duplicate", document_id=existing[digest]["id"])
+                continue
+            if digest in first_with_hash:
+                duplicates_in_batch[i] = first_with_hash[digest]
+                continue
+            first_with_hash[digest] = i
+
+            file_ext = filename.lower().split('.')[-1]
+            rows.append({
+                "title": os.path.splitext(os.path.basename(filename))[0],
+                **document_content_fields(file_texts.pop(i)),
+                "content_hash": digest,
+                "category": category,
+                "size": os.path.getsize(path),
+                "type": DOCUMENT_TYPES[file_ext],
+                "uploaded_by": uploaded_by
+            })
+            row_files.append(i)
+
+        if not rows:
+            return results
+
+        try:
+            documents = await supabase_service.create_documents_batch(rows)
+        except Exception as e:
+            for i in row_files:
+                results[i].update(status="failed", error=f"Failed to save document: {str(e)}")
+            return results
+
+        documents_by_file = {}
+        for i, document in zip(row_files, documents):
+            documents_by_file[i] = document
+            results[i].update(document_id=document["id"], chunks=len(file_chunks[i]))
+
+        failures, reused = await self.index_documents(
+            [(documents_by_file[i], file_chunks[i]) for i in row_files],
+            category
+        )
+
+        failed_files = {}
+        for i in row_files:
+            doc_id = documents_by_file[i]["id"]
+            if doc_id in failures:
+                failed_files[i] = failures[doc_id]
+                results[i].update(status="failed", error=failures[doc_id])
+            else:
+                results[i].update(status="success", reused_chunks=reused.get(doc_id, 0))
+
+        if failed_files:
+            failed_doc_ids = [documents_by_file[i]["id"] for i in failed_files]
+            try:
+                await vector_registry.delete_documents(failed_doc_ids)
+            except Exception:
+                pass
+            await supabase_service.delete_documents_batch(failed_doc_ids)
+            for i in failed_files:
+                results[i]["document_id"] = None
+
+        for i, first in duplicates_in_batch.items():
+            if results[first]["status"] == "success":
+                results[i].update(status="duplicate", document_id=results[first]["document_id"])
+            else:
+                results[i].update(status=results[first]["status"], error=results[first]["error"])
+
+        return results
+
+ingestion_service = IngestionService()
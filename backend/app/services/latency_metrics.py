@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple, Any
+import asyncio
+from ..core.config import settings
+from ..core.sketches import QuantileSketch, latency_recorder, bucket_start
+from .supabase_service import supabase_service
+
+class LatencyMetrics:
+    def __init__(self):
+        self.flushes = 0
+        self.failures = 0
+        self._pruned_at: Optional[datetime] = None
+
+    def observe(self, endpoint: str, mode: Optional[str], response_time: float, route: Optional[Any] = None):
+        latency_recorder.record("total", response_time, endpoint, mode)
+        if route is not None and route.latency is not None:
+            latency_recorder.record("llm", route.latency, endpoint, mode)
+
+    async def flush(self) -> int:
+        pending = latency_recorder.pending()
+        if not pending:
+            return 0
+
+        source = latency_recorder.source
+        updated_at = datetime.now(timezone.utc).isoformat()
+        rows = [
+            {
+                "resolution": resolution,
+                "bucket_start": start.isoformat(),
+                "endpoint": endpoint,
+                "mode": mode,
+                "stage": stage,
+                "source": source,
+                "count": sketch["count"],
+                "sketch": sketch,
+                "updated_at": updated_at
+            }
+            for (resolution, start, endpoint, mode, stage), _, sketch in pending
+        ]
+        for start in range(0, len(rows), 500):
+            await supabase_service.upsert_latency_rollups(rows[start:start + 500])
+
+        latency_recorder.mark_flushed(pending)
+        self.flushes += 1
+        return len(rows)
+
+    async def prune(self):
+        now = datetime.now(timezone.utc)
+        await supabase_service.delete_latency_rollups("minute", now - timedelta(hours=settings.LATENCY_MINUTE_RETENTION_HOURS))
+        await supabase_service.delete_latency_rollups("hour", now - timedelta(days=settings.LATENCY_HOUR_RETENTION_DAYS))
+        self._pruned_at = now
+
+    async def run_flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.LATENCY_FLUSH_SECONDS)
+            try:
+                await self.flush()
+                if self._pruned_at is None or datetime.now(timezone.utc) - self._pruned_at > timedelta(hours=1):
+                    await self.prune()
+            except Exception:
+                self.failures += 1
+
+    def _segments(self, start: datetime, end: datetime) -> List[Tuple[str, datetime, datetime]]:
+        start = bucket_start(start, "minute")
+        if end != bucket_start(end, "minute"):
+            end = bucket_start(end, "minute") + timedelta(minutes=1)
+        minute_cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.LATENCY_MINUTE_RETENTION_HOURS)
+        if start < minute_cutoff:
+            start = bucket_start(start, "hour")
+
+        first_hour = bucket_start(start, "hour")
+        if first_hour < start:
+            first_hour += timedelta(hours=1)
+        last_hour = bucket_start(end, "hour")
+        if first_hour >= last_hour:
+            return [("minute", start, end)]
+        return [
+            ("minute", start, first_hour),
+            ("hour", first_hour, last_hour),
+            ("minute", last_hour, end)
+        ]
+
+    async def summarize(
+        self,
+        start: datetime,
+        end: datetime,
+        endpoint: Optional[str] = None,
+        mode: Optional[str] = None,
+        stage: Optional[str] = None
+    ) -> Dict[Tuple[str, str, str], QuantileSketch]:
+        sketches: Dict[Tuple[str, str, str], QuantileSketch] = {}
+        for resolution, segment_start, segment_end in self._segments(start, end):
+            if segment_start >= segment_end:
+                continue
+            async for row in supabase_service.iter_latency_rollups(
+                resolution, segment_start, segment_end, endpoint=endpoint, mode=mode, stage=stage
+            ):
+                key = (row["endpoint"], row["mode"], row["stage"])
+                sketch = QuantileSketch.from_dict(row["sketch"])
+                if key in sketches:
+                    sketches[key].merge(sketch)
+                else:
+                    sketches[key] = sketch
+        return sketches
+
+    def stats(self) -> Dict[str, Any]:
+        return {**latency_recorder.stats(), "flushes": self.flushes, "failures": self.failures}
+
+latency_metrics = LatencyMetrics()
@@ -0,0 +1,215 @@
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, status
+from typing import Dict, Optional, Tuple, Any
+import asyncio
+import math
+import time
+from ..core.config import settings
+from ..core.request_context import Priority, current_priority, current_user_id
+
+class SchedulerOverloaded(HTTPException):
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="The AI service is busy. Please retry shortly.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+class Reservation:
+    def __init__(self, model: str, tokens: int):
+        self.model = model
+        self.estimated_tokens = tokens
+        self.tokens = tokens
+        self.started_at = time.monotonic()
+
+class _Waiter:
+    def __init__(self, model: str, tokens: int, future: asyncio.Future):
+        self.model = model
+        self.tokens = tokens
+        self.future = future
+        self.queued = True
+
+class LLMScheduler:
+    def __init__(self):
+        self.max_concurrency = settings.LLM_MAX_CONCURRENCY
+        self.max_queue = settings.LLM_MAX_QUEUE
+        self.queue_timeout = settings.LLM_QUEUE_TIMEOUT
+        self._in_flight = 0
+        self._model_in_flight: Dict[str, int] = {}
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._queues = {priority: OrderedDict() for priority in Priority}
+        self._queued = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._avg_hold_time = 1.0
+        self._rejected = 0
+
+    def _model_limit(self, model: str) -> int:
+        return settings.llm_model_concurrency.get(model, settings.LLM_PER_MODEL_CONCURRENCY)
+
+    def _get_buckets(self, model: str) -> Tuple[TokenBucket, TokenBucket]:
+        if model not in self._buckets:
+            requests_per_minute, tokens_per_minute = settings.llm_model_rate_limits.get(
+                model, (settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_TOKENS_PER_MINUTE)
+            )
+            self._buckets[model] = (TokenBucket(requests_per_minute), TokenBucket(tokens_per_minute))
+        return self._buckets[model]
+
+    def _wait_time(self, model: str, tokens: int) -> Optional[float]:
+        if self._in_flight >= self.max_concurrency:
+            return None
+        if self._model_in_flight.get(model, 0) >= self._model_limit(model):
+            return None
+        request_bucket, token_bucket = self._get_buckets(model)
+        return max(request_bucket.wait_time(1), token_bucket.wait_time(tokens))
+
+    def _start(self, model: str, tokens: int):
+        self._in_flight += 1
+        self._model_in_flight[model] = self._model_in_flight.get(model, 0) + 1
+        request_bucket, token_bucket = self._get_buckets(model)
+        request_bucket.consume(1)
+        token_bucket.consume(tokens)
+
+    def _dequeue(self, priority: Priority, user: str, waiter: _Waiter):
+        waiters = self._queues[priority].get(user)
+        if waiter.queued and waiters is not None:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._queues[priority][user]
+            waiter.queued = False
+            self._queued -= 1
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        next_check = None
+        granted = True
+        while granted:
+            granted = False
+            blocked_models = set()
+            for priority in Priority:
+                queue = self._queues[priority]
+                for user in list(queue.keys()):
+                    waiter = queue[user][0]
+                    if waiter.future.done():
+                        self._dequeue(priority, user, waiter)
+                        granted = True
+                        break
+                    if waiter.model in blocked_models:
+                        continue
+                    if self._in_flight >= self.max_concurrency:
+                        return
+                    wait = self._wait_time(waiter.model, waiter.tokens)
+                    if wait is None or wait > 0:
+                        blocked_models.add(waiter.model)
+                        if wait:
+                            next_check = wait if next_check is None else min(next_check, wait)
+                        continue
+                    self._dequeue(priority, user, waiter)
+                    if user in queue:
+                        queue.move_to_end(user)
+                    self._start(waiter.model, waiter.tokens)
+                    waiter.future.set_result(None)
+                    granted = True
+                    break
+                if granted:
+                    break
+
+        if next_check is not None and self._queued:
+            self._timer = asyncio.get_running_loop().call_later(next_check, self._dispatch)
+
+    def _retry_after(self) -> float:
+        return self._avg_hold_time * (1 + self._queued / max(1, self.max_concurrency))
+
+    async def acquire(self, model: str, tokens: int) -> Reservation:
+        if not self._queued and self._wait_time(model, tokens) == 0:
+            self._start(model, tokens)
+            return Reservation(model, tokens)
+
+        if self._queued >= self.max_queue:
+            self._rejected += 1
+            raise SchedulerOverloaded(self._retry_after())
+
+        priority = current_priority.get()
+        user = current_user_id.get() or "anonymous"
+        waiter = _Waiter(model, tokens, asyncio.get_running_loop().create_future())
+        self._queues[priority].setdefault(user, deque()).append(waiter)
+        self._queued += 1
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(waiter.future, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise SchedulerOverloaded(self._retry_after())
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(Reservation(model, tokens))
+            raise
+        finally:
+            self._dequeue(priority, user, waiter)
+
+        return Reservation(model, tokens)
+
+    def release(self, reservation: Reservation):
+        self._in_flight -= 1
+        self._model_in_flight[reservation.model] -= 1
+
+        token_bucket = self._get_buckets(reservation.model)[1]
+        difference = reservation.tokens - reservation.estimated_tokens
+        if difference > 0:
+            token_bucket.consume(difference)
+        elif difference < 0:
+            token_bucket.refund(-difference)
+
+        hold_time = time.monotonic() - reservation.started_at
+        self._avg_hold_time = 0.9 * self._avg_hold_time + 0.1 * hold_time
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, model: str, tokens: int):
+        reservation = await self.acquire(model, tokens)
+        try:
+            yield reservation
+        finally:
+            self.release(reservation)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "rejected": self._rejected,
+            "per_model_in_flight": dict(self._model_in_flight),
+            "avg_hold_time": round(self._avg_hold_time, 3)
+        }
+
+llm_scheduler = LLMScheduler()
@@ -1,152 +1,494 @@
-from openai import OpenAI
-from typing import List, Dict, Any, Optional
+from openai import AsyncOpenAI
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable, Iterable
+import asyncio
 import base64
+import json
+import numpy as np
+import re
+import time
+from ..core import snapshot
+from ..core.cache import LRUCache
 from ..core.config import settings
+from ..core.resilience import HedgedCall
+from ..core.text import normalize_query
+from .audio_processor import audio_processor
+from .llm_scheduler import llm_scheduler
+from ..core.single_flight import SingleFlight
+
+STREAM_END = object()
+
+DEFAULT_SYSTEM_MESSAGE = """You are an expert AI tutor for Chartered Accountancy (CA) students in India.
+Your role is to help students understand complex CA concepts, provide detailed explanations, and answer questions
+accurately based on the Indian CA curriculum. Be professional, encouraging, and thorough in your responses.
+Support both English and Hindi languages when requested."""
+
+DISCUSSION_SYSTEM_MESSAGE = """You are orchestrating a debate between two expert CA professionals:
+- Expert CA: A practicing Chartered Accountant with deep theoretical knowledge
+- Auditor: An experienced auditor with practical implementation focus
+
+Generate a balanced, insightful discussion exploring different perspectives on the topic.
+Each speaker should make 3-4 points. Format the response as a JSON object with a 'discussion' array of objects containing 'speaker' and 'text' fields."""
+
+CONVERSATION_SUMMARY_SYSTEM_MESSAGE = """You maintain a running summary of a tutoring session between a CA student and an AI tutor.
+Merge the new exchanges into the current summary. Keep the topics covered, key facts, figures, section numbers and
+definitions the tutor gave, the student's goals and any open questions. Drop pleasantries and repetition.
+Write compact notes, not a transcript, and never exceed a few short paragraphs."""
+
+COMPLEX_QUERY_PATTERN = re.compile(
+    r"\b(compare|comparison|differen\w*|distinguish|versus|vs|calculat\w*|comput\w*|why|explain|"
+    r"analy[sz]\w*|evaluat\w*|illustrat\w*|procedure|steps|implications?|treatment|case study)\b",
+    re.IGNORECASE
+)
+
+class ChatRoute:
+    def __init__(self, tier: str, model: str, max_tokens: int, temperature: float):
+        self.tier = tier
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.latency: Optional[float] = None
+
+    def shared(self) -> "ChatRoute":
+        route = ChatRoute(self.tier, self.model, self.max_tokens, self.temperature)
+        route.prompt_tokens = 0
+        route.completion_tokens = 0
+        return route
+
+    def analytics_fields(self) -> Dict[str, Any]:
+        return {
+            "model_tier": self.tier,
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "llm_latency": self.latency
+        }
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def estimate_message_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(estimate_tokens(message["content"]) + 4 for message in messages)
+
+class JSONArrayItemParser:
+    def __init__(self):
+        self._containers = []
+        self._in_string = False
+        self._escape = False
+        self._item = None
+        self._item_depth = 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        items = []
+        for char in text:
+            if self._item is not None:
+                self._item.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if char == "{" and self._item is None and self._containers and self._containers[-1] == "[":
+                    self._item = [char]
+                    self._item_depth = len(self._containers)
+                self._containers.append(char)
+            elif char in "}]":
+                if self._containers:
+                    self._containers.pop()
+                if self._item is not None and len(self._containers) == self._item_depth:
+                    try:
+                        items.append(json.loads("".join(self._item)))
+                    except ValueError:
+                        pass
+                    self._item = None
+
+        return items
 
 class OpenAIService:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.async_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.embedding_model = settings.EMBEDDING_MODEL
+        self.embedding_dimension = settings.EMBEDDING_DIMENSION
         self.chat_model = settings.CHAT_MODEL
         self.tts_model = settings.TTS_MODEL
         self.whisper_model = settings.WHISPER_MODEL
+        self.embedding_flight = SingleFlight()
+        self.speech_flight = SingleFlight()
+        self.embedding_call = HedgedCall("embedding", settings.EMBEDDING_DEADLINE)
+        self.embedding_cache = LRUCache(settings.EMBEDDING_CACHE_SIZE)
+        self._streams = set()
+
+    def use_embedding_model(self, model: str, dimension: int):
+        if (model, dimension) == (self.embedding_model, self.embedding_dimension):
+            return
+        self.embedding_model = model
+        self.embedding_dimension = dimension
+        self.embedding_cache.clear()
 
     async def create_embedding(self, text: str) -> List[float]:
-        try:
-            response = self.client.embeddings.create(
-                input=text,
-                model=self.embedding_model,
-                dimensions=settings.EMBEDDING_DIMENSION
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            raise Exception(f"Failed to create embedding: {str(e)}")
+        cached = self.embedding_cache.get(("text", text))
+        if cached is not None:
+            return cached.tolist()
 
-    async def create_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedding_flight.do(
+            (self.embedding_model, text),
+            lambda: self._create_embedding_with_fallback(text)
+        )
+
+    async def _create_embedding_with_fallback(self, text: str) -> List[float]:
         try:
-            response = self.client.embeddings.create(
-                input=texts,
-                model=self.embedding_model,
-                dimensions=settings.EMBEDDING_DIMENSION
-            )
-            return [item.embedding for item in response.data]
-        except Exception as e:
-            raise Exception(f"Failed to create batch embeddings: {str(e)}")
+            embedding = await self.embedding_call(lambda: self._create_embedding(text))
+        except Exception:
+            fallback = self.embedding_cache.get(("query", normalize_query(text)))
+            if fallback is None:
+                raise
+            self.embedding_call.fallbacks += 1
+            return fallback.tolist()
 
-    async def generate_chat_response(
+        vector = np.asarray(embedding, dtype=np.float32)
+        self.embedding_cache.put(("text", text), vector)
+        self.embedding_cache.put(("query", normalize_query(text)), vector)
+        return embedding
+
+    async def _create_embedding(self, text: str) -> List[float]:
+        async with llm_scheduler.slot(self.embedding_model, estimate_tokens(text)):
+            try:
+                response = await self.async_client.embeddings.create(
+                    input=text,
+                    model=self.embedding_model,
+                    dimensions=self.embedding_dimension
+                )
+                return response.data[0].embedding
+            except Exception as e:
+                raise Exception(f"Failed to create embedding: {str(e)}")
+
+    async def create_embeddings_batch(
+        self,
+        texts: List[str],
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None
+    ) -> List[List[float]]:
+        model = model or self.embedding_model
+        async with llm_scheduler.slot(model, sum(estimate_tokens(text) for text in texts)):
+            try:
+                response = await self.async_client.embeddings.create(
+                    input=texts,
+                    model=model,
+                    dimensions=dimensions or self.embedding_dimension
+                )
+                return [item.embedding for item in response.data]
+            except Exception as e:
+                raise Exception(f"Failed to create batch embeddings: {str(e)}")
+
+    def route_chat(self, prompt: str, mode: str = "qa", retrieval_score: Optional[float] = None) -> ChatRoute:
+        if mode == "discussion":
+            return ChatRoute("discussion", self.chat_model, settings.DISCUSSION_MAX_TOKENS, 0.8)
+
+        full = ChatRoute("full", self.chat_model, settings.CHAT_MAX_TOKENS, 0.7)
+        if not settings.ROUTING_ENABLED:
+            return full
+        if retrieval_score is None or retrieval_score < settings.ROUTING_FAST_MIN_SCORE:
+            return full
+        if estimate_tokens(prompt) > settings.ROUTING_FAST_MAX_QUERY_TOKENS or COMPLEX_QUERY_PATTERN.search(prompt):
+            return full
+        return ChatRoute("fast", settings.FAST_CHAT_MODEL, settings.FAST_CHAT_MAX_TOKENS, 0.3)
+
+    def _build_chat_messages(
         self,
         prompt: str,
         context: str = "",
         system_message: str = None,
         conversation_history: List[Dict[str, str]] = None
+    ) -> List[Dict[str, str]]:
+        if system_message is None:
+            system_message = DEFAULT_SYSTEM_MESSAGE
+
+        messages = [{"role": "system", "content": system_message}]
+
+        if conversation_history:
+            messages.extend(conversation_history)
+
+        if context:
+            user_message = f"Context from knowledge base:\n{context}\n\nUser Question: {prompt}"
+        else:
+            user_message = prompt
+
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+    async def generate_chat_response(
+        self,
+        prompt: str,
+        context: str = "",
+        system_message: str = None,
+        conversation_history: List[Dict[str, str]] = None,
+        route: Optional[ChatRoute] = None
     ) -> str:
-        try:
-            if system_message is None:
-                system_message = """You are an expert AI tutor for Chartered Accountancy (CA) students in India.
-Your role is to help students understand complex CA concepts, provide detailed explanations, and answer questions
-accurately based on the Indian CA curriculum. Be professional, encouraging, and thorough in your responses.
-Support both English and Hindi languages when requested."""
+        messages = self._build_chat_messages(prompt, context, system_message, conversation_history)
 
-            messages = [{"role": "system", "content": system_message}]
+        route = route or self.route_chat(prompt)
 
-            if conversation_history:
-                messages.extend(conversation_history[-10:])
+        async with llm_scheduler.slot(route.model, estimate_message_tokens(messages) + route.max_tokens) as reservation:
+            try:
+                started = time.monotonic()
+                response = await self.async_client.chat.completions.create(
+                    model=route.model,
+                    messages=messages,
+                    temperature=route.temperature,
+                    max_tokens=route.max_tokens
+                )
+                route.latency = time.monotonic() - started
 
-            if context:
-                user_message = f"Context from knowledge base:\n{context}\n\nUser Question: {prompt}"
-            else:
-                user_message = prompt
+                if response.usage:
+                    reservation.tokens = response.usage.total_tokens
+                    route.prompt_tokens = response.usage.prompt_tokens
+                    route.completion_tokens = response.usage.completion_tokens
+                return response.choices[0].message.content
+            except Exception as e:
+                raise Exception(f"Failed to generate chat response: {str(e)}")
 
-            messages.append({"role": "user", "content": user_message})
+    async def _start_stream(
+        self,
+        route: ChatRoute,
+        messages: List[Dict[str, str]],
+        parse: Callable[[str], Iterable[Any]],
+        error: str,
+        **options
+    ) -> AsyncIterator[Any]:
+        route.prompt_tokens = estimate_message_tokens(messages)
+        reservation = await llm_scheduler.acquire(route.model, route.prompt_tokens + route.max_tokens)
+        queue: asyncio.Queue = asyncio.Queue()
 
-            response = self.client.chat.completions.create(
-                model=self.chat_model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1500
-            )
+        async def generate():
+            try:
+                started = time.monotonic()
+                stream = await self.async_client.chat.completions.create(
+                    model=route.model,
+                    messages=messages,
+                    temperature=route.temperature,
+                    max_tokens=route.max_tokens,
+                    stream=True,
+                    **options
+                )
 
-            return response.choices[0].message.content
-        except Exception as e:
-            raise Exception(f"Failed to generate chat response: {str(e)}")
+                completion_chars = 0
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        completion_chars += len(chunk.choices[0].delta.content)
+                        for item in parse(chunk.choices[0].delta.content):
+                            queue.put_nowait(item)
+
+                route.latency = time.monotonic() - started
+                route.completion_tokens = completion_chars // 4 + 1
+                queue.put_nowait(STREAM_END)
+            except Exception as e:
+                queue.put_nowait(e)
+            finally:
+                llm_scheduler.release(reservation)
+
+        task = asyncio.create_task(generate())
+        self._streams.add(task)
+        task.add_done_callback(self._streams.discard)
+
+        async def read():
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is STREAM_END:
+                        return
+                    if isinstance(item, Exception):
+                        raise Exception(f"{error}: {str(item)}")
+                    yield item
+            finally:
+                task.cancel()
+
+        return read()
+
+    async def stream_chat_response(
+        self,
+        prompt: str,
+        context: str = "",
+        system_message: str = None,
+        conversation_history: List[Dict[str, str]] = None,
+        route: Optional[ChatRoute] = None
+    ) -> AsyncIterator[str]:
+        messages = self._build_chat_messages(prompt, context, system_message, conversation_history)
+        route = route or self.route_chat(prompt)
+
+        return await self._start_stream(route, messages, lambda delta: (delta,), "Failed to stream chat response")
+
+    def _build_discussion_messages(self, topic: str, context: str = "") -> List[Dict[str, str]]:
+        prompt = f"Topic: {topic}\n"
+        if context:
+            prompt += f"\nContext from knowledge base:\n{context}\n"
+        prompt += "\nGenerate a constructive debate between Expert CA and Auditor on this topic."
+
+        return [
+            {"role": "system", "content": DISCUSSION_SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def generate_discussion(
+        self,
+        topic: str,
+        context: str = "",
+        route: Optional[ChatRoute] = None
+    ) -> List[Dict[str, str]]:
+        messages = self._build_discussion_messages(topic, context)
+        route = route or self.route_chat(topic, mode="discussion")
+
+        async with llm_scheduler.slot(route.model, estimate_message_tokens(messages) + route.max_tokens) as reservation:
+            try:
+                started = time.monotonic()
+                response = await self.async_client.chat.completions.create(
+                    model=route.model,
+                    messages=messages,
+                    temperature=route.temperature,
+                    max_tokens=route.max_tokens,
+                    response_format={"type": "json_object"}
+                )
+                route.latency = time.monotonic() - started
+
+                if response.usage:
+                    reservation.tokens = response.usage.total_tokens
+                    route.prompt_tokens = response.usage.prompt_tokens
+                    route.completion_tokens = response.usage.completion_tokens
+                result = json.loads(response.choices[0].message.content)
+                return result.get("discussion", [])
+            except Exception as e:
+                raise Exception(f"Failed to generate discussion: {str(e)}")
+
+    async def stream_discussion(
+        self,
+        topic: str,
+        context: str = "",
+        route: Optional[ChatRoute] = None
+    ) -> AsyncIterator[Dict[str, str]]:
+        messages = self._build_discussion_messages(topic, context)
+        route = route or self.route_chat(topic, mode="discussion")
+        parser = JSONArrayItemParser()
 
-    async def generate_discussion(self, topic: str, context: str = "") -> List[Dict[str, str]]:
+        def parse(delta: str) -> List[Dict[str, str]]:
+            return [item for item in parser.feed(delta) if "speaker" in item and "text" in item]
+
+        return await self._start_stream(
+            route,
+            messages,
+            parse,
+            "Failed to stream discussion",
+            response_format={"type": "json_object"}
+        )
+
+    async def _transcribe_segment(self, filename: str, audio_content: bytes, content_type: str) -> str:
+        async with llm_scheduler.slot(self.whisper_model, 0):
+            transcript = await self.async_client.audio.transcriptions.create(
+                model=self.whisper_model,
+                file=(filename, audio_content, content_type)
+            )
+        return transcript.text
+
+    async def transcribe_audio(self, audio_content: bytes, filename: str, content_type: str) -> str:
         try:
-            system_message = """You are orchestrating a debate between two expert CA professionals:
-- Expert CA: A practicing Chartered Accountant with deep theoretical knowledge
-- Auditor: An experienced auditor with practical implementation focus
+            audio_format = audio_processor.get_format(filename, content_type)
 
-Generate a balanced, insightful discussion exploring different perspectives on the topic.
-Each speaker should make 3-4 points. Format the response as a JSON array with objects containing 'speaker' and 'text' fields."""
-
-            prompt = f"Topic: {topic}\n"
-            if context:
-                prompt += f"\nContext from knowledge base:\n{context}\n"
-            prompt += "\nGenerate a constructive debate between Expert CA and Auditor on this topic."
-
-            messages = [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ]
-
-            response = self.client.chat.completions.create(
-                model=self.chat_model,
-                messages=messages,
-                temperature=0.8,
-                max_tokens=2000,
-                response_format={"type": "json_object"}
+            if len(audio_content) <= settings.WHISPER_MAX_FILE_SIZE:
+                return await self._transcribe_segment(f"audio.{audio_format}", audio_content, content_type)
+
+            segments = await asyncio.to_thread(
+                audio_processor.split_on_silence,
+                audio_content,
+                audio_format,
+                settings.WHISPER_SEGMENT_SECONDS * 1000
             )
 
-            import json
-            result = json.loads(response.choices[0].message.content)
-            return result.get("discussion", [])
-        except Exception as e:
-            raise Exception(f"Failed to generate discussion: {str(e)}")
+            semaphore = asyncio.Semaphore(settings.WHISPER_MAX_CONCURRENCY)
 
-    async def transcribe_audio(self, audio_file_path: str) -> str:
-        try:
-            with open(audio_file_path, "rb") as audio_file:
-                transcript = self.client.audio.transcriptions.create(
-                    model=self.whisper_model,
-                    file=audio_file
-                )
-            return transcript.text
+            async def transcribe(segment):
+                async with semaphore:
+                    return await self._transcribe_segment(*segment)
+
+            transcripts = await asyncio.gather(*[transcribe(segment) for segment in segments])
+            return " ".join(text.strip() for text in transcripts if text.strip())
         except Exception as e:
             raise Exception(f"Failed to transcribe audio: {str(e)}")
 
     async def generate_speech(self, text: str, voice: str = "alloy") -> bytes:
-        try:
-            response = self.client.audio.speech.create(
-                model=self.tts_model,
-                voice=voice,
-                input=text
-            )
-            return response.content
-        except Exception as e:
-            raise Exception(f"Failed to generate speech: {str(e)}")
+        return await self.speech_flight.do(
+            (self.tts_model, voice, text),
+            lambda: self._generate_speech(text, voice)
+        )
+
+    async def _generate_speech(self, text: str, voice: str) -> bytes:
+        async with llm_scheduler.slot(self.tts_model, estimate_tokens(text)):
+            try:
+                response = await self.async_client.audio.speech.create(
+                    model=self.tts_model,
+                    voice=voice,
+                    input=text
+                )
+                return response.content
+            except Exception as e:
+                raise Exception(f"Failed to generate speech: {str(e)}")
+
+    async def summarize_conversation(self, previous_summary: str, turns: List[Dict[str, str]]) -> str:
+        transcript = "\n\n".join([
+            f"Student: {turn['message']}\nTutor: {turn['bot_response']}" for turn in turns
+        ])
+        messages = [
+            {"role": "system", "content": CONVERSATION_SUMMARY_SYSTEM_MESSAGE},
+            {"role": "user", "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew exchanges:\n{transcript}"}
+        ]
+
+        model = settings.SUMMARY_MODEL
+        async with llm_scheduler.slot(model, estimate_message_tokens(messages) + settings.SUMMARY_MAX_TOKENS) as reservation:
+            try:
+                response = await self.async_client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=0.2,
+                    max_tokens=settings.SUMMARY_MAX_TOKENS
+                )
+
+                if response.usage:
+                    reservation.tokens = response.usage.total_tokens
+                return response.choices[0].message.content.strip()
+            except Exception as e:
+                raise Exception(f"Failed to summarize conversation: {str(e)}")
 
     async def check_ca_relevance(self, query: str) -> bool:
-        try:
-            system_message = """You are a classifier that determines if a query is related to Chartered Accountancy (CA) topics.
+        system_message = """You are a classifier that determines if a query is related to Chartered Accountancy (CA) topics.
 CA topics include: accounting, auditing, taxation, corporate law, financial reporting, IFRS, Indian Accounting Standards,
 GST, income tax, company law, ethics, finance, cost accounting, and related subjects.
 Respond with only 'true' or 'false'."""
 
-            messages = [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": f"Is this query related to CA topics? Query: {query}"}
-            ]
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": f"Is this query related to CA topics? Query: {query}"}
+        ]
 
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                temperature=0.3,
-                max_tokens=10
-            )
+        async with llm_scheduler.slot("gpt-3.5-turbo", estimate_message_tokens(messages) + 10):
+            try:
+                response = await self.async_client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=10
+                )
 
-            result = response.choices[0].message.content.strip().lower()
-            return result == "true"
-        except Exception as e:
-            return True
+                result = response.choices[0].message.content.strip().lower()
+                return result == "true"
+            except Exception as e:
+                return True
 
 openai_service = OpenAIService()
+
+snapshot.register("embedding_cache", openai_service.embedding_cache.dump, openai_service.embedding_cache.load)
@@ -1,99 +1,382 @@
+from fastapi import HTTPException
 from pinecone import Pinecone, ServerlessSpec
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from ..core import snapshot
+from ..core.cache import LRUCache
 from ..core.config import settings
+from ..core.resilience import HedgedCall
+from ..core.text import content_hash
+from .chunk_store import chunk_store
+from .chunk_sync import chunk_sync
+import asyncio
+import hashlib
+import numpy as np
+import re
 import time
 
+def namespace_for(category: Optional[str]) -> str:
+    namespace = re.sub(r"[^a-z0-9]+", "-", (category or "general").lower()).strip("-")
+    return namespace or "general"
+
+def chunk_vector_id(chunk: str) -> str:
+    return f"chunk_{content_hash(chunk)[:32]}"
+
 class PineconeService:
     def __init__(self):
         self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
         self.index_name = settings.PINECONE_INDEX_NAME
         self.dimension = settings.EMBEDDING_DIMENSION
+        self.shadow: Optional[Dict[str, Any]] = None
+        self.shadow_index = None
+        self._namespaces: List[str] = []
+        self._namespaces_loaded_at = 0.0
+        self.search_call = HedgedCall("vector search", settings.SEARCH_DEADLINE)
+        self.local_vectors = LRUCache(settings.SEARCH_FALLBACK_SIZE)
+        self.search_results = LRUCache(settings.SEARCH_RESULT_CACHE_SIZE)
+        self.hydration_fetches = 0
         self._ensure_index_exists()
 
+    def reconnect(self):
+        self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
+        self.index = self.pc.Index(self.index_name)
+
+    def _open_index(self, name: str, dimension: int):
+        if name not in self.pc.list_indexes().names():
+            self.pc.create_index(
+                name=name,
+                dimension=dimension,
+                metric="cosine",
+                spec=ServerlessSpec(
+                    cloud="aws",
+                    region=settings.PINECONE_ENVIRONMENT
+                )
+            )
+            time.sleep(5)
+        return self.pc.Index(name)
+
     def _ensure_index_exists(self):
         try:
-            if self.index_name not in self.pc.list_indexes().names():
-                self.pc.create_index(
-                    name=self.index_name,
-                    dimension=self.dimension,
-                    metric="cosine",
-                    spec=ServerlessSpec(
-                        cloud="aws",
-                        region=settings.PINECONE_ENVIRONMENT
-                    )
-                )
-                time.sleep(5)
-            self.index = self.pc.Index(self.index_name)
+            self.index = self._open_index(self.index_name, self.dimension)
         except Exception as e:
             raise Exception(f"Failed to initialize Pinecone index: {str(e)}")
 
-    async def upsert_document(
+    async def use_index(self, name: str, dimension: int):
+        if name == self.index_name:
+            return
+        try:
+            index = await asyncio.to_thread(self._open_index, name, dimension)
+        except Exception as e:
+            raise Exception(f"Failed to switch Pinecone index: {str(e)}")
+        self.index = index
+        self.index_name = name
+        self.dimension = dimension
+        self._namespaces_loaded_at = 0.0
+        self.local_vectors.clear()
+        self.search_results.clear()
+
+    async def use_shadow_index(self, spec: Optional[Dict[str, Any]]):
+        if spec is None or spec["name"] == self.index_name:
+            self.shadow = None
+            self.shadow_index = None
+            return
+        if self.shadow and self.shadow["name"] == spec["name"]:
+            return
+        try:
+            self.shadow_index = await asyncio.to_thread(self._open_index, spec["name"], spec["dimension"])
+            self.shadow = spec
+        except Exception as e:
+            raise Exception(f"Failed to open shadow Pinecone index: {str(e)}")
+
+    def _write_targets(self) -> List[Any]:
+        return [self.index, self.shadow_index] if self.shadow_index is not None else [self.index]
+
+    def build_vector(self, chunk: str, embedding: List[float], metadata: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": chunk_vector_id(chunk),
+            "values": embedding,
+            "metadata": {
+                **metadata,
+                "text": chunk[:1000]
+            }
+        }
+
+    async def upsert_vectors(
         self,
-        doc_id: str,
-        chunks: List[str],
-        embeddings: List[List[float]],
-        metadata: Dict[str, Any]
+        vectors: List[Dict[str, Any]],
+        namespace: str = "",
+        batch_size: int = 100,
+        shadow: bool = False
     ) -> bool:
+        index = self.shadow_index if shadow else self.index
+        index_name = self.shadow["name"] if shadow else self.index_name
         try:
-            vectors = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                vector_id = f"{doc_id}_chunk_{i}"
-                vector_metadata = {
-                    **metadata,
-                    "chunk_index": i,
-                    "text": chunk[:1000]
-                }
-                vectors.append({
-                    "id": vector_id,
-                    "values": embedding,
-                    "metadata": vector_metadata
-                })
-
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
-
+            batches = [vectors[i:i + batch_size] for i in range(0, len(vectors), batch_size)]
+            await asyncio.gather(*[
+                asyncio.to_thread(index.upsert, vectors=batch, namespace=namespace) for batch in batches
+            ])
+            await asyncio.to_thread(chunk_store.put_many, namespace, vectors, index_name)
+            if namespace not in self._namespaces:
+                self._namespaces_loaded_at = 0.0
+            if not shadow:
+                self.search_results.clear()
             return True
         except Exception as e:
-            raise Exception(f"Failed to upsert document to Pinecone: {str(e)}")
+            raise Exception(f"Failed to upsert vectors to Pinecone: {str(e)}")
+
+    async def list_namespaces(self) -> List[str]:
+        if time.monotonic() - self._namespaces_loaded_at > settings.PINECONE_NAMESPACE_CACHE_SECONDS:
+            stats = await asyncio.to_thread(self.index.describe_index_stats)
+            self._namespaces = list(stats.namespaces.keys())
+            self._namespaces_loaded_at = time.monotonic()
+        return self._namespaces
+
+    def _query_namespace(self, query_params: Dict[str, Any], namespace: str, filter_dict: Optional[Dict[str, Any]]):
+        params = {**query_params, "namespace": namespace}
+        if filter_dict:
+            params["filter"] = filter_dict
+        return self.index.query(**params).matches
+
+    async def _search_remote(
+        self,
+        query_params: Dict[str, Any],
+        filter_dict: Optional[Dict[str, Any]],
+        category: Optional[str]
+    ) -> List[Tuple[str, Any]]:
+        namespaces = await self.list_namespaces()
+        targets: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+        if category:
+            targets.append((namespace_for(category), filter_dict))
+            if "" in namespaces:
+                targets.append(("", {**(filter_dict or {}), "category": {"$eq": category}}))
+        else:
+            targets = [(namespace, filter_dict) for namespace in namespaces] or [("", filter_dict)]
+
+        results = await asyncio.gather(*[
+            asyncio.to_thread(self._query_namespace, query_params, namespace, namespace_filter)
+            for namespace, namespace_filter in targets
+        ])
+        return [
+            (namespace, match)
+            for (namespace, _), namespace_matches in zip(targets, results)
+            for match in namespace_matches
+        ]
+
+    def _search_local(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        filter_dict: Optional[Dict[str, Any]],
+        include_values: bool,
+        category: Optional[str]
+    ) -> Optional[List[Dict[str, Any]]]:
+        candidates = [
+            (vector_id, vector, metadata)
+            for (namespace, vector_id), (vector, metadata) in self.local_vectors.items()
+            if (not category or namespace_for(metadata.get("category")) == namespace_for(category))
+            and all(metadata.get(key) == value for key, value in (filter_dict or {}).items())
+        ]
+        if not candidates:
+            return None
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query)
+        scores = np.stack([vector for _, vector, _ in candidates]) @ query
+
+        matches = []
+        for index in np.argsort(-scores)[:top_k]:
+            vector_id, vector, metadata = candidates[index]
+            item = {
+                "id": vector_id,
+                "score": float(scores[index]),
+                "text": metadata.get("text", ""),
+                "metadata": metadata
+            }
+            if include_values:
+                item["values"] = vector.tolist()
+            matches.append(item)
+        return matches
+
+    def _fetch_chunks(self, namespace: str, ids: List[str]) -> List[Dict[str, Any]]:
+        fetched = self.index.fetch(ids=ids, namespace=namespace)
+        return [
+            {"id": vector.id, "values": vector.values, "metadata": vector.metadata or {}}
+            for vector in fetched.vectors.values()
+        ]
+
+    async def _hydrate(self, hits: List[Tuple[str, str, float]], include_values: bool) -> List[Dict[str, Any]]:
+        index_name = self.index_name if include_values else None
+        ids_by_namespace: Dict[str, List[str]] = {}
+        for namespace, vector_id, _ in hits:
+            ids_by_namespace.setdefault(namespace, []).append(vector_id)
+
+        chunks: Dict[Tuple[str, str], Any] = {}
+        for namespace, ids in ids_by_namespace.items():
+            stored = await asyncio.to_thread(chunk_store.get_many, namespace, ids, index_name)
+            missing = [
+                vector_id for vector_id in ids
+                if vector_id not in stored or (include_values and stored[vector_id][2] is None)
+            ]
+            if missing:
+                self.hydration_fetches += 1
+                fetched = await asyncio.to_thread(self._fetch_chunks, namespace, missing)
+                await asyncio.to_thread(chunk_store.put_many, namespace, fetched, self.index_name)
+                stored.update(await asyncio.to_thread(chunk_store.get_many, namespace, missing, index_name))
+            for vector_id, chunk in stored.items():
+                chunks[(namespace, vector_id)] = chunk
+
+        matches = []
+        for namespace, vector_id, score in hits:
+            chunk = chunks.get((namespace, vector_id))
+            if chunk is None or (include_values and chunk[2] is None):
+                continue
+            text, metadata, vector = chunk
+            metadata = {**metadata, "text": text}
+            item = {"id": vector_id, "score": score, "text": text, "metadata": metadata}
+            if include_values:
+                item["values"] = vector.tolist()
+                self.local_vectors.put((namespace, vector_id), (vector / np.linalg.norm(vector), metadata))
+            matches.append(item)
+        return matches
+
+    def _results_key(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        filter_dict: Optional[Dict[str, Any]],
+        category: Optional[str]
+    ) -> Tuple[Any, ...]:
+        digest = hashlib.blake2b(np.asarray(query_embedding, dtype=np.float32).tobytes(), digest_size=16).hexdigest()
+        return (self.index_name, digest, top_k, namespace_for(category) if category else None, repr(sorted((filter_dict or {}).items())))
 
     async def search_similar(
         self,
         query_embedding: List[float],
         top_k: int = 5,
-        filter_dict: Optional[Dict[str, Any]] = None
+        filter_dict: Optional[Dict[str, Any]] = None,
+        include_values: bool = False,
+        category: Optional[str] = None
     ) -> List[Dict[str, Any]]:
+        query_params = {
+            "vector": query_embedding,
+            "top_k": top_k,
+            "include_metadata": False,
+            "include_values": False
+        }
+
+        key = self._results_key(query_embedding, top_k, filter_dict, category)
+        cached = self.search_results.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            hits = cached[1]
+        else:
+            try:
+                results = await self.search_call(lambda: self._search_remote(query_params, filter_dict, category))
+            except Exception as e:
+                fallback = self._search_local(query_embedding, top_k, filter_dict, include_values, category)
+                if fallback is not None:
+                    self.search_call.fallbacks += 1
+                    return fallback
+                if isinstance(e, HTTPException):
+                    raise
+                raise Exception(f"Failed to search in Pinecone: {str(e)}")
+
+            hits = [
+                (namespace, match.id, match.score)
+                for namespace, match in sorted(results, key=lambda result: result[1].score, reverse=True)[:top_k]
+            ]
+            self.search_results.put(key, (time.monotonic() + settings.SEARCH_RESULT_CACHE_SECONDS, hits))
+
         try:
-            query_params = {
-                "vector": query_embedding,
-                "top_k": top_k,
-                "include_metadata": True
-            }
-            if filter_dict:
-                query_params["filter"] = filter_dict
+            return await self._hydrate(hits, include_values)
+        except Exception as e:
+            raise Exception(f"Failed to load chunk text: {str(e)}")
 
-            results = self.index.query(**query_params)
+    def _copy_within(self, index, ids: List[str], source_namespace: str, target_namespace: str, metadata: Dict[str, Any]):
+        fetched = index.fetch(ids=ids, namespace=source_namespace)
+        vectors = [
+            {
+                "id": vector.id,
+                "values": vector.values,
+                "metadata": {**(vector.metadata or {}), **metadata}
+            }
+            for vector in fetched.vectors.values()
+        ]
+        if vectors:
+            index.upsert(vectors=vectors, namespace=target_namespace)
 
-            matches = []
-            for match in results.matches:
-                matches.append({
-                    "id": match.id,
-                    "score": match.score,
-                    "text": match.metadata.get("text", ""),
-                    "metadata": match.metadata
-                })
+    async def copy_vectors(
+        self,
+        ids: List[str],
+        source_namespace: str,
+        target_namespace: str,
+        metadata: Dict[str, Any],
+        batch_size: int = 100
+    ) -> bool:
+        try:
+            for i in range(0, len(ids), batch_size):
+                await asyncio.gather(*[
+                    asyncio.to_thread(self._copy_within, index, ids[i:i + batch_size], source_namespace, target_namespace, metadata)
+                    for index in self._write_targets()
+                ])
+            await asyncio.to_thread(chunk_store.update_metadata, source_namespace, ids, metadata, target_namespace)
+            await chunk_sync.record(target_namespace, ids)
+            self._namespaces_loaded_at = 0.0
+            self.search_results.clear()
+            return True
+        except Exception as e:
+            raise Exception(f"Failed to copy vectors: {str(e)}")
 
-            return matches
+    async def update_metadata(self, ids: List[str], namespace: str, metadata: Dict[str, Any]) -> bool:
+        try:
+            await asyncio.gather(*[
+                asyncio.to_thread(index.update, id=vector_id, set_metadata=metadata, namespace=namespace)
+                for index in self._write_targets()
+                for vector_id in ids
+            ])
+            await asyncio.to_thread(chunk_store.update_metadata, namespace, ids, metadata)
+            await chunk_sync.record(namespace, ids)
+            self.search_results.clear()
+            return True
         except Exception as e:
-            raise Exception(f"Failed to search in Pinecone: {str(e)}")
+            raise Exception(f"Failed to update vector metadata: {str(e)}")
 
-    async def delete_document(self, doc_id: str) -> bool:
+    async def delete_vectors(self, ids: List[str], namespace: str = "", batch_size: int = 1000) -> bool:
+        for vector_id in ids:
+            self.local_vectors.pop((namespace, vector_id))
         try:
-            self.index.delete(filter={"doc_id": doc_id})
+            await asyncio.gather(*[
+                asyncio.to_thread(index.delete, ids=ids[i:i + batch_size], namespace=namespace)
+                for index in self._write_targets()
+                for i in range(0, len(ids), batch_size)
+            ])
+            await asyncio.to_thread(chunk_store.delete, namespace, ids)
+            await chunk_sync.record(namespace, ids)
+            self.search_results.clear()
             return True
         except Exception as e:
-            raise Exception(f"Failed to delete document from Pinecone: {str(e)}")
+            raise Exception(f"Failed to delete vectors from Pinecone: {str(e)}")
+
+    async def existing_ids(self, ids: List[str], namespace: str, shadow: bool = False, batch_size: int = 100) -> List[str]:
+        index = self.shadow_index if shadow else self.index
+        try:
+            fetched = await asyncio.gather(*[
+                asyncio.to_thread(index.fetch, ids=ids[i:i + batch_size], namespace=namespace)
+                for i in range(0, len(ids), batch_size)
+            ])
+            return [vector_id for result in fetched for vector_id in result.vectors]
+        except Exception as e:
+            raise Exception(f"Failed to fetch vectors from Pinecone: {str(e)}")
+
+    def _list_ids(self, namespace: str, prefix: Optional[str]) -> List[str]:
+        ids = []
+        for page in self.index.list(prefix=prefix, namespace=namespace):
+            ids.extend(page)
+        return ids
+
+    async def list_vector_ids(self, namespace: str = "", prefix: Optional[str] = None) -> List[str]:
+        try:
+            return await asyncio.to_thread(self._list_ids, namespace, prefix)
+        except Exception as e:
+            raise Exception(f"Failed to list vectors in Pinecone: {str(e)}")
 
     async def get_index_stats(self) -> Dict[str, Any]:
         try:
@@ -106,3 +389,5 @@ class PineconeService:
             raise Exception(f"Failed to get index stats: {str(e)}")
 
 pinecone_service = PineconeService()
+
+snapshot.register("local_vectors", pinecone_service.local_vectors.dump, pinecone_service.local_vectors.load)
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Any
+import asyncio
+from ..core.config import settings
+from ..core.profiling import profiler, loop_monitor, drain
+from .supabase_service import supabase_service
+
+class ProfileStore:
+    def __init__(self):
+        self.saved = 0
+        self.failures = 0
+        self._pruned_at: Optional[datetime] = None
+
+    async def flush(self) -> int:
+        rows = drain(profiler.completed) + drain(loop_monitor.completed)
+        if not rows:
+            return 0
+        for start in range(0, len(rows), 100):
+            await supabase_service.save_profiles(rows[start:start + 100])
+        self.saved += len(rows)
+        return len(rows)
+
+    async def prune(self):
+        now = datetime.now(timezone.utc)
+        await supabase_service.delete_profiles(now - timedelta(days=settings.PROFILING_RETENTION_DAYS))
+        self._pruned_at = now
+
+    async def run_flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.PROFILING_FLUSH_SECONDS)
+            try:
+                await self.flush()
+                if self._pruned_at is None or datetime.now(timezone.utc) - self._pruned_at > timedelta(hours=1):
+                    await self.prune()
+            except Exception:
+                self.failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "profiler": profiler.stats(),
+            "loop_monitor": loop_monitor.stats(),
+            "saved": self.saved,
+            "failures": self.failures
+        }
+
+profile_store = ProfileStore()
@@ -0,0 +1,131 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any
+import asyncio
+import numpy as np
+from ..core.config import settings
+from ..core.sketches import SpaceSaving, worker_source
+from ..core.text import normalize_query
+from .supabase_service import supabase_service
+from .openai_service import openai_service
+
+class QueryStats:
+    def __init__(self):
+        self._days: Dict[date, SpaceSaving] = {}
+        self._versions: Dict[date, int] = {}
+        self._flushed: Dict[date, int] = {}
+        self._recent_keys: List[Optional[str]] = [None] * settings.QUERY_STATS_RECENT_QUERIES
+        self._recent_slots: Dict[str, int] = {}
+        self._recent_vectors: Optional[np.ndarray] = None
+        self._next_slot = 0
+        self._embedding_model: Optional[str] = None
+        self.folded = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def _canonical_key(self, key: str) -> str:
+        if key in self._recent_slots:
+            return key
+
+        vector = openai_service.embedding_cache.peek(("query", key))
+        if vector is None:
+            return key
+        unit = vector / (np.linalg.norm(vector) or 1.0)
+
+        if openai_service.embedding_model != self._embedding_model:
+            self._recent_keys = [None] * len(self._recent_keys)
+            self._recent_slots = {}
+            self._recent_vectors = None
+            self._embedding_model = openai_service.embedding_model
+
+        if self._recent_vectors is not None:
+            similarities = self._recent_vectors @ unit
+            best = int(np.argmax(similarities))
+            if similarities[best] >= settings.QUERY_STATS_SIMILARITY and self._recent_keys[best] is not None:
+                self.folded += 1
+                return self._recent_keys[best]
+        else:
+            self._recent_vectors = np.zeros((len(self._recent_keys), unit.shape[0]), dtype=np.float32)
+
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % len(self._recent_keys)
+        if self._recent_keys[slot] is not None:
+            self._recent_slots.pop(self._recent_keys[slot], None)
+        self._recent_keys[slot] = key
+        self._recent_slots[key] = slot
+        self._recent_vectors[slot] = unit
+        return key
+
+    def observe(self, query: str):
+        key = normalize_query(query)
+        if not key:
+            return
+        key = self._canonical_key(key)
+
+        today = datetime.now(timezone.utc).date()
+        summary = self._days.get(today)
+        if summary is None:
+            summary = self._days[today] = SpaceSaving(settings.QUERY_STATS_CAPACITY)
+        summary.add(key, label=query.strip()[:200])
+        self._versions[today] = self._versions.get(today, 0) + 1
+
+    async def flush(self) -> int:
+        pending = [
+            (day, version, self._days[day].to_dict())
+            for day, version in self._versions.items()
+            if self._flushed.get(day) != version
+        ]
+        if not pending:
+            return 0
+
+        source = worker_source()
+        updated_at = datetime.now(timezone.utc).isoformat()
+        await supabase_service.upsert_query_stats([
+            {"period": "day", "period_start": day.isoformat(), "source": source, "sketch": sketch, "updated_at": updated_at}
+            for day, _, sketch in pending
+        ])
+
+        today = datetime.now(timezone.utc).date()
+        for day, version, _ in pending:
+            self._flushed[day] = version
+            if day < today and self._versions.get(day) == version:
+                self._days.pop(day, None)
+                self._versions.pop(day, None)
+                self._flushed.pop(day, None)
+        self.flushes += 1
+        return len(pending)
+
+    async def run_flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.QUERY_STATS_FLUSH_SECONDS)
+            try:
+                await self.flush()
+            except Exception:
+                self.failures += 1
+
+    async def top(self, days: Optional[int] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        if days is None:
+            rows, total = await asyncio.gather(
+                supabase_service.get_query_stats(),
+                supabase_service.get_query_stats_total()
+            )
+            if total:
+                rows.append(total)
+        else:
+            since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+            rows = await supabase_service.get_query_stats(since=since)
+
+        merged = SpaceSaving(settings.QUERY_STATS_CAPACITY)
+        for row in rows:
+            merged.merge(SpaceSaving.from_dict(row["sketch"], settings.QUERY_STATS_CAPACITY))
+        return merged.top(limit)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open_days": len(self._days),
+            "tracked_queries": sum(len(summary.counters) for summary in self._days.values()),
+            "folded_near_duplicates": self.folded,
+            "flushes": self.flushes,
+            "failures": self.failures
+        }
+
+query_stats = QueryStats()
@@ -0,0 +1,152 @@
+from typing import List, Dict, Optional, Tuple, Any
+import numpy as np
+from ..core.config import settings
+from ..core.single_flight import SingleFlight
+from ..core.text import normalize_query
+from .openai_service import openai_service, estimate_tokens, ChatRoute
+from .pinecone_service import pinecone_service
+from .answer_store import answer_store
+from .conversation_memory import conversation_memory
+
+OFF_TOPIC_RESPONSE = "I specialize in topics related to Chartered Accountancy. Please ask a question about accounting, tax, audit, or other CA subjects."
+
+def diversify_matches(matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not matches:
+        return []
+
+    scores = np.asarray([match["score"] for match in matches], dtype=np.float32)
+    floor = max(settings.RETRIEVAL_MIN_SCORE, float(scores.max()) - settings.RETRIEVAL_SCORE_MARGIN)
+    pool = [match for match, score in zip(matches, scores) if score >= floor]
+    if not pool:
+        return []
+
+    relevance = scores[scores >= floor]
+    vectors = np.asarray([match["values"] for match in pool], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    similarity = vectors @ vectors.T
+
+    redundancy = np.zeros(len(pool), dtype=np.float32)
+    available = np.ones(len(pool), dtype=bool)
+    budget = settings.RETRIEVAL_CONTEXT_TOKENS
+    weight = settings.RETRIEVAL_MMR_LAMBDA
+    selected = []
+
+    while available.any() and len(selected) < settings.RETRIEVAL_MAX_K:
+        mmr = weight * relevance - (1 - weight) * redundancy
+        mmr[~available] = -np.inf
+        index = int(np.argmax(mmr))
+        available[index] = False
+
+        if selected and redundancy[index] >= settings.RETRIEVAL_DUPLICATE_SIMILARITY:
+            continue
+
+        tokens = estimate_tokens(pool[index]["text"])
+        if selected and tokens > budget:
+            continue
+
+        budget -= tokens
+        selected.append(index)
+        redundancy = np.maximum(redundancy, similarity[index])
+
+    return [
+        {key: value for key, value in pool[index].items() if key != "values"}
+        for index in selected
+    ]
+
+class RAGService:
+    def __init__(self):
+        self.answer_flight = SingleFlight()
+
+    async def retrieve(self, query_embedding: List[float], category: Optional[str] = None) -> List[Dict[str, Any]]:
+        similar_docs = await pinecone_service.search_similar(
+            query_embedding=query_embedding,
+            top_k=settings.RETRIEVAL_CANDIDATES,
+            include_values=True,
+            category=category
+        )
+
+        return diversify_matches(similar_docs)
+
+    def build_context(self, matches: List[Dict[str, Any]]) -> str:
+        return "\n\n".join([doc["text"] for doc in matches])
+
+    async def retrieve_matches(self, query: str, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        query_embedding = await openai_service.create_embedding(query)
+        return await self.retrieve(query_embedding, category)
+
+    async def retrieve_context(self, query: str, category: Optional[str] = None) -> str:
+        return self.build_context(await self.retrieve_matches(query, category))
+
+    def route(self, query: str, mode: str, matches: List[Dict[str, Any]]) -> ChatRoute:
+        top_score = max((match["score"] for match in matches), default=None)
+        return openai_service.route_chat(query, mode, top_score)
+
+    async def get_conversation_messages(self, conversation_id: Optional[str]) -> List[Dict[str, str]]:
+        return await conversation_memory.get_messages(conversation_id)
+
+    async def _generate_answer(
+        self,
+        message: str,
+        mode: str,
+        conversation_id: Optional[str],
+        category: Optional[str] = None
+    ) -> Tuple[str, Optional[List[Dict[str, str]]], Optional[ChatRoute]]:
+        is_relevant = await openai_service.check_ca_relevance(message)
+        if not is_relevant:
+            return OFF_TOPIC_RESPONSE, None, None
+
+        matches = await self.retrieve_matches(message, category)
+        context = self.build_context(matches)
+        route = self.route(message, mode, matches)
+        conversation_history = await self.get_conversation_messages(conversation_id)
+
+        if mode == "discussion":
+            discussion = await openai_service.generate_discussion(
+                topic=message,
+                context=context,
+                route=route
+            )
+
+            discussion_text = "\n\n".join([
+                f"{item['speaker']}: {item['text']}" for item in discussion
+            ])
+            return discussion_text, discussion, route
+
+        response_text = await openai_service.generate_chat_response(
+            prompt=message,
+            context=context,
+            conversation_history=conversation_history,
+            route=route
+        )
+        return response_text, None, route
+
+    async def answer(
+        self,
+        message: str,
+        mode: str = "qa",
+        conversation_id: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> Tuple[str, Optional[List[Dict[str, str]]], Optional[ChatRoute]]:
+        if conversation_id:
+            return await self._generate_answer(message, mode, conversation_id, category)
+
+        if not category:
+            precomputed = answer_store.get(message, mode)
+            if precomputed:
+                return precomputed["answer"], precomputed.get("discussion"), None
+
+        leader = []
+
+        async def generate():
+            leader.append(True)
+            return await self._generate_answer(message, mode, None, category)
+
+        response_text, discussion, route = await self.answer_flight.do(
+            ("answer", mode, category, normalize_query(message)),
+            generate
+        )
+        if route and not leader:
+            route = route.shared()
+        return response_text, discussion, route
+
+rag_service = RAGService()
@@ -1,7 +1,24 @@
 from supabase import create_client, Client
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, AsyncIterator
+from datetime import date, datetime
 from ..core.config import settings
+from ..core.pagination import keyset_page
+from ..core.text import compress_text, decompress_text
+
+DOCUMENT_LIST_COLUMNS = "id,title,category,size,type,uploaded_by,uploaded_at"
+CHAT_COLUMNS = "id,user_id,conversation_id,message,bot_response,mode,timestamp"
+CHAT_PREVIEW_COLUMNS = "id,user_id,conversation_id,message,bot_response_preview,mode,timestamp"
+USER_PUBLIC_COLUMNS = "id,name,email,role,created_at"
+
+def document_content_fields(text: str) -> Dict[str, Optional[str]]:
+    if len(text) >= settings.DOCUMENT_COMPRESS_MIN_CHARS:
+        return {"content": None, "content_compressed": compress_text(text)}
+    return {"content": text, "content_compressed": None}
+
+def document_text(row: Dict[str, Any]) -> str:
+    if row.get("content_compressed"):
+        return decompress_text(row["content_compressed"])
+    return row.get("content") or ""
 
 class SupabaseService:
     def __init__(self):
@@ -19,18 +36,34 @@ class SupabaseService:
         return result.data[0] if result.data else None
 
     async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
-        result = self.client.table("users").select("*").eq("email", email).maybeSingle().execute()
-        return result.data
+        result = self.client.table("users").select("*").eq("email", email).maybe_single().execute()
+        return result.data if result else None
 
     async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
-        result = self.client.table("users").select("*").eq("id", user_id).maybeSingle().execute()
+        result = self.client.table("users").select("*").eq("id", user_id).maybe_single().execute()
+        return result.data if result else None
+
+    async def count_users(self, role: Optional[str] = None) -> int:
+        query = self.client.table("users").select("id", count="exact")
+        if role:
+            query = query.eq("role", role)
+        result = query.limit(1).execute()
+        return result.count or 0
+
+    async def count_chats(self) -> int:
+        result = self.client.table("chats").select("id", count="exact").limit(1).execute()
+        return result.count or 0
+
+    async def get_recent_users(self, limit: int = 10) -> List[Dict[str, Any]]:
+        result = self.client.table("users").select(USER_PUBLIC_COLUMNS).order("created_at", desc=True).limit(limit).execute()
         return result.data
 
     async def create_document(self, title: str, content: str, category: str, size: int,
-                             file_type: str, uploaded_by: str) -> Dict[str, Any]:
+                             file_type: str, uploaded_by: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
         data = {
             "title": title,
-            "content": content,
+            **document_content_fields(content),
+            "content_hash": content_hash,
             "category": category,
             "size": size,
             "type": file_type,
@@ -40,14 +73,70 @@ class SupabaseService:
         result = self.client.table("documents").insert(data).execute()
         return result.data[0] if result.data else None
 
+    async def create_documents_batch(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        uploaded_at = datetime.utcnow().isoformat()
+        data = [{**document, "uploaded_at": uploaded_at} for document in documents]
+        result = self.client.table("documents").insert(data).execute()
+        return result.data
+
+    async def find_documents_by_hash(self, content_hashes: List[str], category: str) -> List[Dict[str, Any]]:
+        result = self.client.table("documents").select(f"{DOCUMENT_LIST_COLUMNS},content_hash").in_("content_hash", content_hashes).eq("category", category).execute()
+        return result.data
+
+    async def get_document_titles(self, doc_ids: List[str]) -> Dict[str, str]:
+        result = self.client.table("documents").select("id,title").in_("id", doc_ids).execute()
+        return {row["id"]: row["title"] for row in result.data}
+
+    async def delete_documents_batch(self, doc_ids: List[str]) -> int:
+        result = self.client.table("documents").delete().in_("id", doc_ids).execute()
+        return len(result.data)
+
+    async def get_documents_after(self, cursor: Optional[List[str]], limit: int) -> List[Dict[str, Any]]:
+        query = self.client.table("documents").select("id,title,category,content,content_compressed,uploaded_at")
+        return keyset_page(query, "uploaded_at", cursor, limit, descending=False).execute().data
+
+    async def iter_document_summaries(self, page_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        cursor = None
+        while True:
+            query = self.client.table("documents").select("id,category,uploaded_at")
+            page = keyset_page(query, "uploaded_at", cursor, page_size, descending=False).execute().data
+            for row in page:
+                yield row
+            if len(page) < page_size:
+                break
+            cursor = [page[-1]["uploaded_at"], page[-1]["id"]]
+
     async def get_documents(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
         result = self.client.table("documents").select("*").order("uploaded_at", desc=True).limit(limit).offset(offset).execute()
         return result.data
 
-    async def get_document_by_id(self, doc_id: str) -> Optional[Dict[str, Any]]:
-        result = self.client.table("documents").select("*").eq("id", doc_id).maybeSingle().execute()
+    async def list_documents(
+        self,
+        limit: int = 100,
+        cursor: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        search: Optional[str] = None,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        query = self.client.table("documents").select(DOCUMENT_LIST_COLUMNS)
+        if category:
+            query = query.eq("category", category)
+        if search:
+            query = query.ilike("title", f"%{search}%")
+        query = keyset_page(query, "uploaded_at", cursor, limit)
+        if offset and not cursor:
+            query = query.offset(offset)
+        result = query.execute()
         return result.data
 
+    async def count_documents(self) -> int:
+        result = self.client.table("documents").select("id", count="exact").limit(1).execute()
+        return result.count or 0
+
+    async def get_document_by_id(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        result = self.client.table("documents").select(DOCUMENT_LIST_COLUMNS).eq("id", doc_id).maybe_single().execute()
+        return result.data if result else None
+
     async def update_document(self, doc_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         result = self.client.table("documents").update(updates).eq("id", doc_id).execute()
         return result.data[0] if result.data else None
@@ -56,6 +145,86 @@ class SupabaseService:
         result = self.client.table("documents").delete().eq("id", doc_id).execute()
         return len(result.data) > 0
 
+    async def register_document_vectors(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        result = self.client.table("document_vectors").upsert(rows, on_conflict="document_id,vector_id").execute()
+        return result.data
+
+    async def iter_document_vectors(
+        self,
+        doc_ids: Optional[List[str]] = None,
+        page_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        cursor = None
+        while True:
+            query = self.client.table("document_vectors").select("id,document_id,vector_id,namespace,chunk_index,created_at")
+            if doc_ids is not None:
+                query = query.in_("document_id", doc_ids)
+            page = keyset_page(query, "created_at", cursor, page_size, descending=False).execute().data
+            for row in page:
+                yield row
+            if len(page) < page_size:
+                break
+            cursor = [page[-1]["created_at"], page[-1]["id"]]
+
+    async def get_vector_references(
+        self,
+        namespace: str,
+        vector_ids: List[str],
+        batch_size: int = 200
+    ) -> List[Dict[str, Any]]:
+        rows = []
+        for start in range(0, len(vector_ids), batch_size):
+            result = self.client.table("document_vectors").select("document_id,vector_id,chunk_index").eq("namespace", namespace).in_("vector_id", vector_ids[start:start + batch_size]).execute()
+            rows.extend(result.data)
+        return rows
+
+    async def update_document_vectors_namespace(self, doc_id: str, namespace: str) -> int:
+        result = self.client.table("document_vectors").update({"namespace": namespace}).eq("document_id", doc_id).execute()
+        return len(result.data)
+
+    async def delete_document_vectors(self, doc_ids: List[str]) -> int:
+        result = self.client.table("document_vectors").delete().in_("document_id", doc_ids).execute()
+        return len(result.data)
+
+    async def delete_document_vector_refs(
+        self,
+        doc_id: str,
+        namespace: str,
+        vector_ids: List[str],
+        batch_size: int = 200
+    ) -> int:
+        deleted = 0
+        for start in range(0, len(vector_ids), batch_size):
+            result = self.client.table("document_vectors").delete().eq("document_id", doc_id).eq("namespace", namespace).in_("vector_id", vector_ids[start:start + batch_size]).execute()
+            deleted += len(result.data)
+        return deleted
+
+    async def delete_document_vector_entries(self, entry_ids: List[str]) -> int:
+        result = self.client.table("document_vectors").delete().in_("id", entry_ids).execute()
+        return len(result.data)
+
+    async def log_vector_changes(self, namespace: str, vector_ids: List[str], batch_size: int = 1000) -> int:
+        rows = [
+            {"namespace": namespace, "vector_ids": vector_ids[start:start + batch_size]}
+            for start in range(0, len(vector_ids), batch_size)
+        ]
+        if not rows:
+            return 0
+        result = self.client.table("vector_changes").insert(rows).execute()
+        return len(result.data)
+
+    async def get_vector_changes_after(self, change_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        result = self.client.table("vector_changes").select("id,namespace,vector_ids").gt("id", change_id).order("id").limit(limit).execute()
+        return result.data
+
+    async def get_latest_vector_change_id(self) -> int:
+        result = self.client.table("vector_changes").select("id").order("id", desc=True).limit(1).execute()
+        return result.data[0]["id"] if result.data else 0
+
+    async def delete_vector_changes(self, before: datetime) -> int:
+        result = self.client.table("vector_changes").delete().lt("created_at", before.isoformat()).execute()
+        return len(result.data)
+
     async def save_chat(self, user_id: str, message: str, bot_response: str,
                        mode: str, conversation_id: str) -> Dict[str, Any]:
         data = {
@@ -69,24 +238,274 @@ class SupabaseService:
         result = self.client.table("chats").insert(data).execute()
         return result.data[0] if result.data else None
 
-    async def get_chat_history(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
-        result = self.client.table("chats").select("*").eq("user_id", user_id).order("timestamp", desc=True).limit(limit).execute()
+    async def get_chat_history(self, user_id: str, limit: int = 50, cursor: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        query = self.client.table("chats").select(CHAT_COLUMNS).eq("user_id", user_id)
+        result = keyset_page(query, "timestamp", cursor, limit).execute()
+        return result.data
+
+    async def get_chat_previews(self, user_id: str, limit: int = 50, cursor: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        query = self.client.table("chats").select(CHAT_PREVIEW_COLUMNS).eq("user_id", user_id)
+        result = keyset_page(query, "timestamp", cursor, limit).execute()
         return result.data
 
     async def get_conversation_history(self, conversation_id: str, limit: int = 20) -> List[Dict[str, Any]]:
         result = self.client.table("chats").select("*").eq("conversation_id", conversation_id).order("timestamp", desc=False).limit(limit).execute()
         return result.data
 
-    async def log_analytics(self, query: str, response_time: float, feedback: Optional[str] = None) -> Dict[str, Any]:
+    async def get_recent_turns(self, conversation_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        query = self.client.table("chats").select("id,message,bot_response,timestamp").eq("conversation_id", conversation_id)
+        result = query.order("timestamp", desc=True).limit(limit).execute()
+        return list(reversed(result.data))
+
+    async def get_turns_after(
+        self,
+        conversation_id: str,
+        after: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        query = self.client.table("chats").select("id,message,bot_response,timestamp").eq("conversation_id", conversation_id)
+        if after:
+            query = query.gt("timestamp", after)
+        result = query.order("timestamp", desc=False).limit(limit).execute()
+        return result.data
+
+    async def get_conversation_summary(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        result = self.client.table("conversation_summaries").select("*").eq("conversation_id", conversation_id).maybe_single().execute()
+        return result.data if result else None
+
+    async def save_conversation_summary(
+        self,
+        conversation_id: str,
+        summary: str,
+        summarized_through: str,
+        summarized_turns: int,
+        previous_turns: Optional[int] = None
+    ) -> bool:
+        data = {
+            "conversation_id": conversation_id,
+            "summary": summary,
+            "summarized_through": summarized_through,
+            "summarized_turns": summarized_turns,
+            "updated_at": datetime.utcnow().isoformat()
+        }
+        if previous_turns is None:
+            result = self.client.table("conversation_summaries").upsert(data, on_conflict="conversation_id", ignore_duplicates=True).execute()
+        else:
+            result = self.client.table("conversation_summaries").update(data).eq("conversation_id", conversation_id).eq("summarized_turns", previous_turns).execute()
+        return bool(result.data)
+
+    async def get_conversation_page(
+        self,
+        conversation_id: str,
+        user_id: str,
+        limit: int = 100,
+        cursor: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        query = self.client.table("chats").select(CHAT_COLUMNS).eq("conversation_id", conversation_id).eq("user_id", user_id)
+        result = keyset_page(query, "timestamp", cursor, limit, descending=False).execute()
+        return result.data
+
+    async def iter_conversation(self, conversation_id: str, user_id: str, page_size: int = 200) -> AsyncIterator[Dict[str, Any]]:
+        cursor = None
+        while True:
+            page = await self.get_conversation_page(conversation_id, user_id, limit=page_size, cursor=cursor)
+            for row in page:
+                yield row
+            if len(page) < page_size:
+                break
+            cursor = [page[-1]["timestamp"], page[-1]["id"]]
+
+    async def log_analytics(
+        self,
+        query: str,
+        response_time: float,
+        feedback: Optional[str] = None,
+        model_tier: Optional[str] = None,
+        model: Optional[str] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        llm_latency: Optional[float] = None
+    ) -> Dict[str, Any]:
         data = {
             "query": query,
             "response_time": response_time,
             "feedback": feedback,
+            "model_tier": model_tier,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "llm_latency": llm_latency,
             "created_at": datetime.utcnow().isoformat()
         }
         result = self.client.table("analytics").insert(data).execute()
         return result.data[0] if result.data else None
 
+    async def iter_analytics_queries(
+        self,
+        since: datetime,
+        page_size: int = 1000,
+        columns: str = "id,query,created_at"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        cursor = None
+        while True:
+            query = self.client.table("analytics").select(columns).gte("created_at", since.isoformat())
+            page = keyset_page(query, "created_at", cursor, page_size, descending=False).execute().data
+            for row in page:
+                yield row
+            if len(page) < page_size:
+                break
+            cursor = [page[-1]["created_at"], page[-1]["id"]]
+
+    def export_page_query(
+        self,
+        table: str,
+        columns: List[str],
+        order_column: str,
+        cursor: Optional[List[str]],
+        limit: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Any:
+        query = self.client.table(table).select(",".join(columns))
+        if start:
+            query = query.gte(order_column, start.isoformat())
+        if end:
+            query = query.lt(order_column, end.isoformat())
+        return keyset_page(query, order_column, cursor, limit, descending=False)
+
+    async def get_vector_indexes(self) -> List[Dict[str, Any]]:
+        result = self.client.table("vector_indexes").select("*").in_("status", ["active", "building"]).execute()
+        return result.data
+
+    async def create_vector_index(self, name: str, embedding_model: str, dimension: int, status: str) -> Dict[str, Any]:
+        result = self.client.table("vector_indexes").insert({
+            "name": name,
+            "embedding_model": embedding_model,
+            "dimension": dimension,
+            "status": status
+        }).execute()
+        return result.data[0] if result.data else None
+
+    async def update_vector_index(self, name: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        result = self.client.table("vector_indexes").update({
+            **updates,
+            "updated_at": datetime.utcnow().isoformat()
+        }).eq("name", name).execute()
+        return result.data[0] if result.data else None
+
+    async def activate_vector_index(self, name: str) -> bool:
+        result = self.client.rpc("activate_vector_index", {"target": name}).execute()
+        return bool(result.data)
+
+    async def upsert_latency_rollups(self, rows: List[Dict[str, Any]]) -> int:
+        result = self.client.table("latency_rollups").upsert(
+            rows,
+            on_conflict="resolution,bucket_start,endpoint,mode,stage,source"
+        ).execute()
+        return len(result.data)
+
+    async def iter_latency_rollups(
+        self,
+        resolution: str,
+        start: datetime,
+        end: datetime,
+        endpoint: Optional[str] = None,
+        mode: Optional[str] = None,
+        stage: Optional[str] = None,
+        page_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        cursor = None
+        while True:
+            query = self.client.table("latency_rollups").select("id,bucket_start,endpoint,mode,stage,sketch").eq(
+                "resolution", resolution
+            ).gte("bucket_start", start.isoformat()).lt("bucket_start", end.isoformat())
+            if endpoint:
+                query = query.eq("endpoint", endpoint)
+            if mode:
+                query = query.eq("mode", mode)
+            if stage:
+                query = query.eq("stage", stage)
+            page = keyset_page(query, "bucket_start", cursor, page_size, descending=False).execute().data
+            for row in page:
+                yield row
+            if len(page) < page_size:
+                break
+            cursor = [page[-1]["bucket_start"], page[-1]["id"]]
+
+    async def delete_latency_rollups(self, resolution: str, before: datetime) -> int:
+        result = self.client.table("latency_rollups").delete().eq("resolution", resolution).lt("bucket_start", before.isoformat()).execute()
+        return len(result.data)
+
+    async def save_profiles(self, rows: List[Dict[str, Any]]) -> int:
+        result = self.client.table("profiles").insert(rows).execute()
+        return len(result.data)
+
+    async def list_profiles(
+        self,
+        kind: Optional[str] = None,
+        path: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        query = self.client.table("profiles").select("id,kind,source,method,path,status_code,duration_ms,samples,created_at")
+        if kind:
+            query = query.eq("kind", kind)
+        if path:
+            query = query.eq("path", path)
+        result = query.order("created_at", desc=True).limit(limit).execute()
+        return result.data
+
+    async def get_profile(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        result = self.client.table("profiles").select("*").eq("id", profile_id).maybe_single().execute()
+        return result.data if result else None
+
+    async def delete_profiles(self, before: datetime) -> int:
+        result = self.client.table("profiles").delete().lt("created_at", before.isoformat()).execute()
+        return len(result.data)
+
+    async def upsert_query_stats(self, rows: List[Dict[str, Any]]) -> int:
+        result = self.client.table("query_stats").upsert(rows, on_conflict="period,period_start,source").execute()
+        return len(result.data)
+
+    async def get_query_stats(self, since: Optional[date] = None, before: Optional[date] = None) -> List[Dict[str, Any]]:
+        query = self.client.table("query_stats").select("id,period_start,source,sketch").eq("period", "day")
+        if since:
+            query = query.gte("period_start", since.isoformat())
+        if before:
+            query = query.lt("period_start", before.isoformat())
+        return query.execute().data
+
+    async def get_query_stats_total(self) -> Optional[Dict[str, Any]]:
+        result = self.client.table("query_stats").select("id,sketch").eq("period", "all").limit(1).execute()
+        return result.data[0] if result.data else None
+
+    async def save_query_stats_total(self, sketch: Dict[str, Any], row_id: Optional[str] = None) -> Dict[str, Any]:
+        data = {"period": "all", "source": "compacted", "sketch": sketch, "updated_at": datetime.utcnow().isoformat()}
+        if row_id:
+            result = self.client.table("query_stats").update(data).eq("id", row_id).execute()
+        else:
+            result = self.client.table("query_stats").insert(data).execute()
+        return result.data[0] if result.data else None
+
+    async def delete_query_stats(self, row_ids: List[str]) -> int:
+        result = self.client.table("query_stats").delete().in_("id", row_ids).execute()
+        return len(result.data)
+
+    async def get_precomputed_answers(self) -> List[Dict[str, Any]]:
+        result = self.client.table("precomputed_answers").select("*").gt("expires_at", datetime.utcnow().isoformat()).execute()
+        return result.data
+
+    async def upsert_precomputed_answers(self, answers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        result = self.client.table("precomputed_answers").upsert(answers, on_conflict="query_key,mode").execute()
+        return result.data
+
+    async def delete_precomputed_answers_for_documents(self, doc_ids: List[str]) -> int:
+        result = self.client.table("precomputed_answers").delete().ov("source_doc_ids", doc_ids).execute()
+        return len(result.data)
+
+    async def delete_expired_precomputed_answers(self) -> int:
+        result = self.client.table("precomputed_answers").delete().lte("expires_at", datetime.utcnow().isoformat()).execute()
+        return len(result.data)
+
     async def get_analytics(self, limit: int = 100) -> List[Dict[str, Any]]:
         result = self.client.table("analytics").select("*").order("created_at", desc=True).limit(limit).execute()
         return result.data
@@ -0,0 +1,139 @@
+from collections import defaultdict
+from typing import List, Dict, Optional, Any
+import asyncio
+from .supabase_service import supabase_service
+from .pinecone_service import pinecone_service, namespace_for, chunk_vector_id
+
+def vector_references(doc_id: str, chunks: List[str], namespace: str) -> List[Dict[str, Any]]:
+    references = {}
+    for chunk_index, chunk in enumerate(chunks):
+        references.setdefault(chunk_vector_id(chunk), {
+            "document_id": doc_id,
+            "vector_id": chunk_vector_id(chunk),
+            "namespace": namespace,
+            "chunk_index": chunk_index
+        })
+    return list(references.values())
+
+class VectorRegistry:
+    async def _entries_by_namespace(self, doc_ids: List[str]) -> Dict[str, List[str]]:
+        entries = defaultdict(list)
+        async for row in supabase_service.iter_document_vectors(doc_ids):
+            entries[row["namespace"]].append(row["vector_id"])
+        return entries
+
+    async def _release(self, namespace: str, ids: List[str]) -> int:
+        references = await supabase_service.get_vector_references(namespace, ids)
+        owners = {}
+        for row in references:
+            owners.setdefault(row["vector_id"], row)
+
+        orphaned = [vector_id for vector_id in ids if vector_id not in owners]
+        if orphaned:
+            await pinecone_service.delete_vectors(orphaned, namespace=namespace)
+
+        if not owners:
+            return len(orphaned)
+
+        titles = await supabase_service.get_document_titles(list({row["document_id"] for row in owners.values()}))
+        reassigned = defaultdict(list)
+        for vector_id, row in owners.items():
+            reassigned[(row["document_id"], row.get("chunk_index"))].append(vector_id)
+
+        def owner_metadata(doc_id: str, chunk_index: Optional[int]) -> Dict[str, Any]:
+            metadata = {"doc_id": doc_id}
+            if doc_id in titles:
+                metadata["title"] = titles[doc_id]
+            if chunk_index is not None:
+                metadata["chunk_index"] = chunk_index
+            return metadata
+
+        await asyncio.gather(*[
+            pinecone_service.update_metadata(vector_ids, namespace, owner_metadata(doc_id, chunk_index))
+            for (doc_id, chunk_index), vector_ids in reassigned.items()
+        ])
+        return len(orphaned)
+
+    async def document_references(self, doc_id: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                "document_id": row["document_id"],
+                "vector_id": row["vector_id"],
+                "namespace": row["namespace"],
+                "chunk_index": row.get("chunk_index")
+            }
+            async for row in supabase_service.iter_document_vectors([doc_id])
+        ]
+
+    async def settle_references(self, doc_id: str, keep: List[Dict[str, Any]], drop: List[Dict[str, Any]]) -> int:
+        try:
+            for start in range(0, len(keep), 500):
+                await supabase_service.register_document_vectors(keep[start:start + 500])
+
+            kept = {(row["namespace"], row["vector_id"]) for row in keep}
+            dropped = defaultdict(list)
+            for row in drop:
+                if (row["namespace"], row["vector_id"]) not in kept:
+                    dropped[row["namespace"]].append(row["vector_id"])
+            for namespace, ids in dropped.items():
+                await supabase_service.delete_document_vector_refs(doc_id, namespace, ids)
+            deleted = await asyncio.gather(*[
+                self._release(namespace, ids) for namespace, ids in dropped.items()
+            ])
+            return sum(deleted)
+        except Exception as e:
+            raise Exception(f"Failed to update document vectors: {str(e)}")
+
+    async def delete_documents(self, doc_ids: List[str]) -> int:
+        if not doc_ids:
+            return 0
+
+        try:
+            entries = await self._entries_by_namespace(doc_ids)
+            await supabase_service.delete_document_vectors(doc_ids)
+            deleted = await asyncio.gather(*[
+                self._release(namespace, ids) for namespace, ids in entries.items()
+            ])
+            return sum(deleted)
+        except Exception as e:
+            raise Exception(f"Failed to delete document vectors: {str(e)}")
+
+    async def move_document(self, doc_id: str, new_category: Optional[str]) -> bool:
+        new_namespace = namespace_for(new_category)
+
+        try:
+            entries = await self._entries_by_namespace([doc_id])
+            moving = {namespace: ids for namespace, ids in entries.items() if namespace != new_namespace}
+            if not moving:
+                return True
+
+            present = {
+                row["vector_id"]
+                for row in await supabase_service.get_vector_references(
+                    new_namespace, [vector_id for ids in moving.values() for vector_id in ids]
+                )
+            }
+            copied = []
+            try:
+                for namespace, ids in moving.items():
+                    missing = [vector_id for vector_id in ids if vector_id not in present]
+                    copied.extend(missing)
+                    await pinecone_service.copy_vectors(
+                        missing, namespace, new_namespace, {"doc_id": doc_id, "category": new_category}
+                    )
+                    present.update(missing)
+                await supabase_service.update_document_vectors_namespace(doc_id, new_namespace)
+            except Exception:
+                try:
+                    await self._release(new_namespace, copied)
+                except Exception:
+                    pass
+                raise
+
+            for namespace, ids in moving.items():
+                await self._release(namespace, ids)
+            return True
+        except Exception as e:
+            raise Exception(f"Failed to move document vectors: {str(e)}")
+
+vector_registry = VectorRegistry()
@@ -1,9 +1,60 @@
+import argparse
 import uvicorn
+from app.core.config import settings
 
-if __name__ == "__main__":
+def run_development():
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
         reload=True
     )
+
+def run_production():
+    from gunicorn.app.base import BaseApplication
+    from app.core.server import post_fork, worker_exit
+
+    class ProductionServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+            from app.core import snapshot
+            if settings.CACHE_SNAPSHOT_PATH:
+                snapshot.load(settings.CACHE_SNAPSHOT_PATH)
+            return app
+
+    ProductionServer({
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": settings.server_workers,
+        "worker_class": "app.core.server.ProductionWorker",
+        "preload_app": True,
+        "timeout": settings.SERVER_TIMEOUT,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "keepalive": settings.SERVER_KEEPALIVE,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS // 10,
+        "post_fork": post_fork,
+        "worker_exit": worker_exit
+    }).run()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the CA Chatbot API server")
+    parser.add_argument(
+        "--mode",
+        choices=["development", "production"],
+        default=settings.SERVER_MODE,
+        help="development: single process with auto-reload; production: multi-worker gunicorn"
+    )
+    args = parser.parse_args()
+
+    if args.mode == "production":
+        run_production()
+    else:
+        run_development()
@@ -0,0 +1,17 @@
+/*
+  # Document listing indexes
+
+  1. Indexes
+    - Composite (uploaded_at, id) index on documents for keyset pagination
+    - Composite (category, uploaded_at, id) index for category-filtered listing
+    - Trigram index on documents.title for title search
+
+  2. Extensions
+    - pg_trgm for trigram title search
+*/
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_documents_uploaded_at_id ON documents(uploaded_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_documents_category_uploaded_at_id ON documents(category, uploaded_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_documents_title_trgm ON documents USING gin (title gin_trgm_ops);
@@ -0,0 +1,18 @@
+/*
+  # Chat history pagination
+
+  1. Changes
+    - `chats.bot_response_preview` (text, generated): first 280 characters of
+      `bot_response`, so history list views do not transfer full answers
+
+  2. Indexes
+    - Composite (user_id, timestamp, id) index for per-user history keyset pagination
+    - Composite (conversation_id, timestamp, id) index for conversation paging and export
+*/
+
+ALTER TABLE chats
+  ADD COLUMN IF NOT EXISTS bot_response_preview text
+  GENERATED ALWAYS AS (left(bot_response, 280)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_chats_user_id_timestamp_id ON chats(user_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_chats_conversation_id_timestamp_id ON chats(conversation_id, timestamp, id);
@@ -0,0 +1,45 @@
+/*
+  # Precomputed answers
+
+  1. New Tables
+    - `precomputed_answers`
+      - `id` (uuid, primary key)
+      - `query_key` (text): normalized form of the representative query
+      - `mode` (text, enum: qa/discussion)
+      - `query` (text): representative query as asked
+      - `variants` (text[]): normalized near-duplicate queries served by this answer
+      - `answer` (text)
+      - `discussion` (jsonb, nullable)
+      - `source_doc_ids` (uuid[]): documents the answer was grounded on
+      - `hits` (integer): query frequency in the mined window
+      - `refreshed_at` (timestamptz)
+      - `expires_at` (timestamptz)
+
+  2. Security
+    - Enable RLS; only the service role reads and writes this table
+
+  3. Indexes
+    - Unique (query_key, mode)
+    - GIN index on source_doc_ids for invalidation by document
+    - expires_at index for expiry sweeps
+*/
+
+CREATE TABLE IF NOT EXISTS precomputed_answers (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  query_key text NOT NULL,
+  mode text NOT NULL DEFAULT 'qa' CHECK (mode IN ('qa', 'discussion')),
+  query text NOT NULL,
+  variants text[] NOT NULL DEFAULT '{}',
+  answer text NOT NULL,
+  discussion jsonb,
+  source_doc_ids uuid[] NOT NULL DEFAULT '{}',
+  hits integer NOT NULL DEFAULT 0,
+  refreshed_at timestamptz DEFAULT now(),
+  expires_at timestamptz NOT NULL,
+  UNIQUE (query_key, mode)
+);
+
+CREATE INDEX IF NOT EXISTS idx_precomputed_answers_source_doc_ids ON precomputed_answers USING gin (source_doc_ids);
+CREATE INDEX IF NOT EXISTS idx_precomputed_answers_expires_at ON precomputed_answers(expires_at);
+
+ALTER TABLE precomputed_answers ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,36 @@
+/*
+  # Document vector registry
+
+  1. New Tables
+    - `document_vectors`
+      - `id` (uuid, primary key)
+      - `document_id` (uuid): owning document; intentionally not a foreign key so
+        entries outlive a deleted document until its vectors are removed
+      - `vector_id` (text): Pinecone vector id (`{document_id}_chunk_{i}`)
+      - `namespace` (text): Pinecone namespace holding the vector
+      - `created_at` (timestamptz)
+
+  2. Security
+    - Enable RLS; only the service role reads and writes this table
+
+  3. Indexes
+    - Unique (document_id, vector_id)
+    - (created_at, id) for keyset iteration during reconciliation
+
+  4. Notes
+    - Documents uploaded before this migration have no entries; run
+      `python -m app.jobs.reconcile_vectors` once to backfill them from the index
+*/
+
+CREATE TABLE IF NOT EXISTS document_vectors (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  document_id uuid NOT NULL,
+  vector_id text NOT NULL,
+  namespace text NOT NULL DEFAULT '',
+  created_at timestamptz DEFAULT now(),
+  UNIQUE (document_id, vector_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_document_vectors_created_at_id ON document_vectors(created_at, id);
+
+ALTER TABLE document_vectors ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,17 @@
+/*
+  # Model routing analytics
+
+  1. Changes
+    - `analytics.model_tier` (text, nullable): fast, full or discussion; null for
+      precomputed and off-topic answers that made no generation call
+    - `analytics.model` (text, nullable): model that generated the answer
+    - `analytics.prompt_tokens` (integer, nullable)
+    - `analytics.completion_tokens` (integer, nullable): estimated for streamed answers
+    - `analytics.llm_latency` (float, nullable): seconds spent in the generation call
+*/
+
+ALTER TABLE analytics ADD COLUMN IF NOT EXISTS model_tier text;
+ALTER TABLE analytics ADD COLUMN IF NOT EXISTS model text;
+ALTER TABLE analytics ADD COLUMN IF NOT EXISTS prompt_tokens integer;
+ALTER TABLE analytics ADD COLUMN IF NOT EXISTS completion_tokens integer;
+ALTER TABLE analytics ADD COLUMN IF NOT EXISTS llm_latency float;
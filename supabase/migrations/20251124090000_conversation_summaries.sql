@@ -0,0 +1,25 @@
+/*
+  # Conversation summaries
+
+  1. New Tables
+    - `conversation_summaries`
+      - `conversation_id` (uuid, primary key)
+      - `summary` (text): rolling summary of the turns already compacted
+      - `summarized_through` (timestamptz): timestamp of the newest turn folded into the summary
+      - `summarized_turns` (integer): number of turns folded in so far; compaction
+        updates are conditional on it so concurrent workers cannot overwrite each other
+      - `updated_at` (timestamptz)
+
+  2. Security
+    - Enable RLS; only the service role reads and writes this table
+*/
+
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+  conversation_id uuid PRIMARY KEY,
+  summary text NOT NULL DEFAULT '',
+  summarized_through timestamptz NOT NULL,
+  summarized_turns integer NOT NULL DEFAULT 0,
+  updated_at timestamptz DEFAULT now()
+);
+
+ALTER TABLE conversation_summaries ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,23 @@
+/*
+  # Content hashes for document and chunk deduplication
+
+  1. Changes
+    - `documents.content_hash` (text): sha256 of the extracted text
+
+  2. Indexes
+    - (content_hash, category) on `documents` for duplicate lookups on upload
+    - (namespace, vector_id) on `document_vectors` for reference counting
+      shared chunk vectors
+
+  3. Notes
+    - New vector ids are `chunk_{sha256 prefix}` of the chunk text and may be
+      referenced by several documents in the same namespace; a vector is only
+      deleted once its last `document_vectors` entry is gone
+    - Existing documents keep their `{document_id}_chunk_{i}` vectors and a
+      NULL content hash
+*/
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash text;
+
+CREATE INDEX IF NOT EXISTS idx_documents_content_hash_category ON documents(content_hash, category);
+CREATE INDEX IF NOT EXISTS idx_document_vectors_namespace_vector_id ON document_vectors(namespace, vector_id);
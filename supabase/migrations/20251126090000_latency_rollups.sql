@@ -0,0 +1,47 @@
+/*
+  # Latency rollups
+
+  1. New Tables
+    - `latency_rollups`
+      - `id` (uuid, primary key)
+      - `resolution` (text): minute or hour
+      - `bucket_start` (timestamptz): start of the minute or hour
+      - `endpoint` (text): chat, chat_stream, voice or background
+      - `mode` (text): qa, discussion or none
+      - `stage` (text): total, llm, embedding or vector_search
+      - `source` (text): host:pid of the worker that wrote the row
+      - `count` (integer)
+      - `sketch` (jsonb): mergeable log-bucket quantile sketch
+      - `updated_at` (timestamptz)
+
+  2. Security
+    - Enable RLS; only the service role reads and writes this table
+
+  3. Indexes
+    - Unique (resolution, bucket_start, endpoint, mode, stage, source); each
+      worker overwrites its own row for a bucket with its full sketch
+    - (resolution, bucket_start, id) for window scans
+
+  4. Notes
+    - Percentiles for a window are computed by merging the sketches of every
+      worker and bucket in it; minute rows are kept for 48 hours and hour rows
+      for 90 days by default
+*/
+
+CREATE TABLE IF NOT EXISTS latency_rollups (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  resolution text NOT NULL,
+  bucket_start timestamptz NOT NULL,
+  endpoint text NOT NULL,
+  mode text NOT NULL,
+  stage text NOT NULL,
+  source text NOT NULL,
+  count integer NOT NULL DEFAULT 0,
+  sketch jsonb NOT NULL,
+  updated_at timestamptz DEFAULT now(),
+  UNIQUE (resolution, bucket_start, endpoint, mode, stage, source)
+);
+
+CREATE INDEX IF NOT EXISTS idx_latency_rollups_resolution_bucket_start_id ON latency_rollups(resolution, bucket_start, id);
+
+ALTER TABLE latency_rollups ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,41 @@
+/*
+  # Top query summaries
+
+  1. New Tables
+    - `query_stats`
+      - `id` (uuid, primary key)
+      - `period` (text): day, or all for the compacted all-time summary
+      - `period_start` (date, nullable): UTC day; null for the all-time row
+      - `source` (text): host:pid of the worker that wrote the row, or
+        compacted
+      - `sketch` (jsonb): Space-Saving summary of normalized queries with
+        counts, error bounds and a display label per query
+      - `updated_at` (timestamptz)
+
+  2. Security
+    - Enable RLS; only the service role reads and writes this table
+
+  3. Indexes
+    - Unique (period, period_start, source); each worker overwrites its own
+      row for the day with its full summary
+    - (period, period_start) for window reads
+
+  4. Notes
+    - Top queries for a window are computed by merging the summaries in it
+    - `python -m app.jobs.compact_query_stats` folds daily rows older than
+      `QUERY_STATS_DAILY_RETENTION_DAYS` into the all-time row
+*/
+
+CREATE TABLE IF NOT EXISTS query_stats (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  period text NOT NULL DEFAULT 'day',
+  period_start date,
+  source text NOT NULL,
+  sketch jsonb NOT NULL,
+  updated_at timestamptz DEFAULT now(),
+  UNIQUE (period, period_start, source)
+);
+
+CREATE INDEX IF NOT EXISTS idx_query_stats_period_period_start ON query_stats(period, period_start);
+
+ALTER TABLE query_stats ENABLE ROW LEVEL SECURITY;
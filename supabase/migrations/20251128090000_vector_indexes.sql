@@ -0,0 +1,61 @@
+/*
+  # Vector index registry
+
+  1. New Tables
+    - `vector_indexes`
+      - `name` (text, primary key): Pinecone index name
+      - `embedding_model` (text) and `dimension` (integer) used for its vectors
+      - `status` (text): active (serves reads), building (being filled by
+        `app.jobs.reindex_vectors` and dual-written by uploads) or retired
+      - `checkpoint` (jsonb): keyset cursor of the last re-embedded document
+      - `documents_done`, `vectors_written` (integer): migration progress
+      - `created_at`, `activated_at`, `updated_at` (timestamptz)
+
+  2. New Functions
+    - `activate_vector_index(target text)`: retires the active index and
+      activates the building one in a single transaction
+
+  3. Security
+    - Enable RLS; only the service role reads and writes this table
+
+  4. Indexes
+    - Unique partial index on `status` so there is at most one active and one
+      building index
+
+  5. Notes
+    - With no rows, the API uses `PINECONE_INDEX_NAME`, `EMBEDDING_MODEL` and
+      `EMBEDDING_DIMENSION`; the first migration records them as the active index
+*/
+
+CREATE TABLE IF NOT EXISTS vector_indexes (
+  name text PRIMARY KEY,
+  embedding_model text NOT NULL,
+  dimension integer NOT NULL,
+  status text NOT NULL CHECK (status IN ('active', 'building', 'retired')),
+  checkpoint jsonb,
+  documents_done integer NOT NULL DEFAULT 0,
+  vectors_written integer NOT NULL DEFAULT 0,
+  created_at timestamptz DEFAULT now(),
+  activated_at timestamptz,
+  updated_at timestamptz DEFAULT now()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_vector_indexes_single_status
+  ON vector_indexes(status) WHERE status IN ('active', 'building');
+
+ALTER TABLE vector_indexes ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION activate_vector_index(target text)
+RETURNS boolean
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM vector_indexes WHERE name = target AND status = 'building') THEN
+    RAISE EXCEPTION 'Index % is not being built', target;
+  END IF;
+
+  UPDATE vector_indexes SET status = 'retired', updated_at = now() WHERE status = 'active';
+  UPDATE vector_indexes SET status = 'active', activated_at = now(), updated_at = now() WHERE name = target;
+  RETURN true;
+END;
+$$;
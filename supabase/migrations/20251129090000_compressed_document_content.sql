@@ -0,0 +1,28 @@
+/*
+  # Compressed storage for large document text
+
+  1. Changes
+    - `documents.content_compressed` (text): base64 of the zlib-compressed
+      extracted text
+    - `documents.content` is now nullable; exactly one of `content` and
+      `content_compressed` is set
+
+  2. Notes
+    - Texts of DOCUMENT_COMPRESS_MIN_CHARS characters or more are written to
+      `content_compressed` with `content` left NULL; shorter texts stay in
+      `content` so they remain readable in the dashboard
+    - Existing rows are left as they are
+*/
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_compressed text;
+ALTER TABLE documents ALTER COLUMN content DROP NOT NULL;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_constraint WHERE conname = 'documents_content_present'
+  ) THEN
+    ALTER TABLE documents ADD CONSTRAINT documents_content_present
+      CHECK (content IS NOT NULL OR content_compressed IS NOT NULL);
+  END IF;
+END $$;
@@ -0,0 +1,43 @@
+/*
+  # Request profiles and event-loop blocks
+
+  1. New Tables
+    - `profiles`
+      - `id` (uuid, primary key): also returned in the `X-Profile-Id` header
+      - `kind` (text): request or loop_block
+      - `source` (text): host:pid of the worker that recorded it
+      - `method` (text), `path` (text): the profiled request; for loop blocks
+        `path` names the task that held the loop
+      - `status_code` (integer)
+      - `duration_ms` (double precision): request wall time or block length
+      - `samples` (integer): number of stack samples taken
+      - `stacks` (text): collapsed stacks, one `frame;frame;frame count` line
+        per distinct stack
+      - `created_at` (timestamptz)
+
+  2. Security
+    - Enable RLS; only the service role reads and writes this table
+
+  3. Indexes
+    - (kind, created_at) for listing recent profiles
+
+  4. Notes
+    - Rows older than PROFILING_RETENTION_DAYS are deleted by the API workers
+*/
+
+CREATE TABLE IF NOT EXISTS profiles (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  kind text NOT NULL CHECK (kind IN ('request', 'loop_block')),
+  source text NOT NULL,
+  method text,
+  path text,
+  status_code integer,
+  duration_ms double precision NOT NULL,
+  samples integer NOT NULL DEFAULT 0,
+  stacks text NOT NULL DEFAULT '',
+  created_at timestamptz DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_profiles_kind_created_at ON profiles(kind, created_at DESC);
+
+ALTER TABLE profiles ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,15 @@
+/*
+  # Indexes for streaming exports
+
+  1. Indexes
+    - (timestamp, id) on `chats` and (created_at, id) on `analytics` so admin
+      exports can walk either table in ascending keyset order over any date
+      range without sorting
+
+  2. Notes
+    - Documents already have (uploaded_at DESC, id DESC), which serves the
+      ascending walk as well
+*/
+
+CREATE INDEX IF NOT EXISTS idx_chats_timestamp_id ON chats(timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_analytics_created_at_id ON analytics(created_at, id);
@@ -0,0 +1,15 @@
+/*
+  # Chunk position on document vector entries
+
+  1. Modified Tables
+    - `document_vectors`
+      - `chunk_index` (integer, nullable): position of the chunk in the owning
+        document, so a shared vector can be repointed at another owner with
+        the right `chunk_index` when its current owner is deleted
+
+  2. Notes
+    - Existing entries stay NULL; repointing keeps the vector's current
+      `chunk_index` for them until the next reindex registers it
+*/
+
+ALTER TABLE document_vectors ADD COLUMN IF NOT EXISTS chunk_index integer;
@@ -0,0 +1,37 @@
+/*
+  # Vector metadata change log
+
+  1. New Tables
+    - `vector_changes`
+      - `id` (bigint identity, primary key): increasing change number that
+        workers use as their sync cursor
+      - `namespace` (text): Pinecone namespace of the changed vectors
+      - `vector_ids` (text[]): vectors whose owner metadata changed or which
+        were deleted
+      - `created_at` (timestamptz)
+
+  2. Security
+    - Enable RLS; only the service role reads and writes this table
+
+  3. Indexes
+    - (created_at) for pruning
+
+  4. Notes
+    - Chunk text and vectors are content addressed and never change, so
+      workers only drop the listed ids from their local chunk store and
+      re-fetch them on the next hit
+    - Rows older than CHUNK_CHANGE_RETENTION_DAYS are deleted by the API
+      workers; a worker that has not synced for that long clears its local
+      metadata instead
+*/
+
+CREATE TABLE IF NOT EXISTS vector_changes (
+  id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  namespace text NOT NULL DEFAULT '',
+  vector_ids text[] NOT NULL,
+  created_at timestamptz DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_vector_changes_created_at ON vector_changes(created_at);
+
+ALTER TABLE vector_changes ENABLE ROW LEVEL SECURITY;